@@ -4,104 +4,242 @@ from kivy.uix.gridlayout import GridLayout
 from kivy.uix.button import Button
 from kivy.uix.label import Label
 from kivy.uix.widget import Widget
-from kivy.graphics import Color, Rectangle, Ellipse, Line
+from kivy.graphics import Color, Rectangle, Ellipse, Line, InstructionGroup
 from kivy.animation import Animation
 from kivy.clock import Clock
 from kivy.uix.popup import Popup
-import queue
+from kivy.core.text import Label as CoreLabel
+from kivy.core.window import Window
+import os
+import threading
+import time
+
+import frame_stats
+import river_crossing_core as core
+from solution_cache import shared_cache
+
+
+# Colour emoji fonts on Windows, macOS and Linux
+EMOJI_FONTS = ("C:/Windows/Fonts/seguiemj.ttf",
+               "/System/Library/Fonts/Apple Color Emoji.ttc",
+               "/usr/share/fonts/truetype/noto/NotoColorEmoji.ttf",
+               "/usr/share/fonts/noto/NotoColorEmoji.ttf")
+
+
+class EmojiAtlas:
+    # Each character's glyph is rendered once per size into a texture, which
+    # the canvas then draws as a plain textured Rectangle. Without an emoji
+    # font the texture holds the character's initial instead.
+    def __init__(self):
+        self.font_name = next((path for path in EMOJI_FONTS if os.path.exists(path)), None)
+        self.textures = {}
+
+    def get(self, name, size):
+        key = (name, size)
+        if key not in self.textures:
+            glyph = core.EMOJI.get(name)
+            if glyph is not None and self.font_name is not None:
+                label = CoreLabel(text=glyph, font_size=size, font_name=self.font_name)
+            else:
+                label = CoreLabel(text=name[:1], font_size=size, bold=True)
+            label.refresh()
+            self.textures[key] = label.texture
+        return self.textures[key]
 
 
 class GameCanvas(Widget):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        self.rules = core.CLASSIC
         self.game_state = (False, False, False, False)  # farmer, lion, goat, grass
-        self.character_positions = {}
         self.boat_pos = [0, 0]
-        self.bind(size=self.update_graphics, pos=self.update_graphics)
 
-    def update_graphics(self, *args):
-        self.canvas.clear()
-        with self.canvas:
-            # Background gradient effect
-            Color(0.6, 0.8, 1, 1)  # Light blue
-            Rectangle(pos=self.pos, size=self.size)
-
-            # River with gradient effect
-            river_width = self.width * 0.25
-            river_x = self.center_x - river_width / 2
-
-            # River gradient layers
-            Color(0.2, 0.4, 0.8, 1)  # Dark blue
-            Rectangle(pos=(river_x, self.y), size=(river_width, self.height))
-            Color(0.3, 0.5, 0.9, 0.7)  # Medium blue overlay
-            Rectangle(pos=(river_x + 10, self.y + 10), size=(river_width - 20, self.height - 20))
-
-            # River waves effect
-            Color(1, 1, 1, 0.3)  # White waves
-            for i in range(5):
-                y_pos = self.y + (self.height / 5) * i + 30
-                Line(points=[river_x + 20, y_pos, river_x + river_width - 20, y_pos + 10], width=2)
-
-            # Left side (starting)
-            Color(0.4, 0.8, 0.4, 1)  # Green
-            Rectangle(pos=(self.x, self.y), size=(river_x - self.x, self.height))
-
-            # Right side (target)
-            Color(0.5, 0.9, 0.5, 1)  # Lighter green
-            Rectangle(pos=(river_x + river_width, self.y),
-                      size=(self.right - river_x - river_width, self.height))
-
-            # Boat
-            farmer, lion, goat, grass = self.game_state
-            boat_x = river_x + 30 if not farmer else river_x + river_width - 80
-            boat_y = self.center_y - 25
-
-            Color(0.6, 0.4, 0.2, 1)  # Brown boat
-            Ellipse(pos=(boat_x, boat_y), size=(50, 25))
-            Color(0.3, 0.2, 0.1, 1)  # Dark outline
-            Line(ellipse=(boat_x, boat_y, 50, 25), width=2)
-
-        self.draw_characters()
-
-    def draw_characters(self):
-        farmer, lion, goat, grass = self.game_state
-
-        # Character data: (emoji, color, state)
-        characters = [
-            ("👨‍🌾", "Farmer", farmer),
-            ("🦁", "Lion", lion),
-            ("🐐", "Goat", goat),
-            ("🌾", "Grass", grass)
-        ]
+        # Background, river and waves only change with the widget's size; the
+        # boat and characters are kept instructions that just get moved
+        self.static_group = InstructionGroup()
+        self.dynamic_group = InstructionGroup()
+        self.canvas.add(self.static_group)
+        self.canvas.add(self.dynamic_group)
+        self.scene_rules = None  # Rules the sprites were built for
+        self.emoji_atlas = EmojiAtlas()
 
-        river_width = self.width * 0.25
-        river_x = self.center_x - river_width / 2
+        self.bind(size=self.update_graphics, pos=self.update_graphics)
 
-        # Position counters
-        left_count = 0
-        right_count = 0
+    def set_game_state(self, state):
+        self.game_state = state
+        self.update_sprites()
 
-        with self.canvas:
-            for i, (emoji, name, side) in enumerate(characters):
-                if side:  # Right side
-                    x = river_x + river_width + 50 + (right_count % 2) * 100
-                    y = self.y + 100 + (right_count // 2) * 120
-                    right_count += 1
-                else:  # Left side
-                    x = self.x + 50 + (left_count % 2) * 100
-                    y = self.y + 100 + (left_count // 2) * 120
-                    left_count += 1
+    def update_graphics(self, *args):
+        self.build_background()
+        self.update_sprites()
 
-                # Character circle background
-                if side:
-                    Color(0.3, 0.7, 0.3, 0.8)  # Green for target side
-                else:
-                    Color(0.7, 0.7, 0.3, 0.8)  # Yellow for starting side
+    def river_geometry(self):
+        river_width = self.width * 0.25
+        return self.center_x - river_width / 2, river_width
+
+    def build_background(self):
+        river_x, river_width = self.river_geometry()
+        group = self.static_group
+        group.clear()
+
+        # Background gradient effect
+        group.add(Color(0.6, 0.8, 1, 1))  # Light blue
+        group.add(Rectangle(pos=self.pos, size=self.size))
+
+        # River gradient layers
+        group.add(Color(0.2, 0.4, 0.8, 1))  # Dark blue
+        group.add(Rectangle(pos=(river_x, self.y), size=(river_width, self.height)))
+        group.add(Color(0.3, 0.5, 0.9, 0.7))  # Medium blue overlay
+        group.add(Rectangle(pos=(river_x + 10, self.y + 10), size=(river_width - 20, self.height - 20)))
+
+        # River waves effect
+        group.add(Color(1, 1, 1, 0.3))  # White waves
+        for i in range(5):
+            y_pos = self.y + (self.height / 5) * i + 30
+            group.add(Line(points=[river_x + 20, y_pos, river_x + river_width - 20, y_pos + 10], width=2))
+
+        # Left side (starting)
+        group.add(Color(0.4, 0.8, 0.4, 1))  # Green
+        group.add(Rectangle(pos=(self.x, self.y), size=(river_x - self.x, self.height)))
+
+        # Right side (target)
+        group.add(Color(0.5, 0.9, 0.5, 1))  # Lighter green
+        group.add(Rectangle(pos=(river_x + river_width, self.y),
+                            size=(self.right - river_x - river_width, self.height)))
+
+    def build_sprites(self):
+        group = self.dynamic_group
+        group.clear()
+
+        # Boat
+        group.add(Color(0.6, 0.4, 0.2, 1))  # Brown boat
+        self.boat_body = Ellipse(size=(50, 25))
+        group.add(self.boat_body)
+        group.add(Color(0.3, 0.2, 0.1, 1))  # Dark outline
+        self.boat_outline = Line(width=2)
+        group.add(self.boat_outline)
+
+        # One circle per character, recoloured when it changes sides, with its
+        # emoji texture on top
+        self.character_sprites = []
+        for name in self.rules.names:
+            color = Color(0.7, 0.7, 0.3, 0.8)
+            circle = Ellipse()
+            group.add(color)
+            group.add(circle)
+            group.add(Color(1, 1, 1, 1))
+            glyph = Rectangle()
+            group.add(glyph)
+            self.character_sprites.append((color, circle, glyph))
+
+        self.scene_rules = self.rules
+        self.drawn_layout = None
+        self.drawn_state = None
+
+    def update_sprites(self):
+        if self.scene_rules is not self.rules:
+            self.build_sprites()
+        layout = (tuple(self.pos), tuple(self.size))
+        if layout == self.drawn_layout and self.game_state == self.drawn_state:
+            return
 
-                Ellipse(pos=(x - 30, y - 30), size=(60, 60))
+        # Boat
+        river_x, river_width = self.river_geometry()
+        boat_x = river_x + 30 if not self.game_state[self.rules.boat_index] else river_x + river_width - 80
+        boat_y = self.center_y - 25
+        self.boat_body.pos = (boat_x, boat_y)
+        self.boat_outline.ellipse = (boat_x, boat_y, 50, 25)
+        self.boat_pos = [boat_x, boat_y]
+
+        self.draw_characters(layout != self.drawn_layout)
+        self.drawn_layout = layout
+        self.drawn_state = self.game_state
+
+    def draw_characters(self, resized):
+        # Each character keeps its own slot on either bank, so a crossing
+        # only moves and recolours the characters that crossed
+        radius = self.character_radius()
+        for i, (color, circle, glyph) in enumerate(self.character_sprites):
+            side = self.game_state[i]
+            if not resized and self.drawn_state[i] == side:
+                continue
+            if resized:
+                glyph.texture = self.emoji_atlas.get(self.rules.names[i], int(radius * 1.2))
+                glyph.size = glyph.texture.size
+            x, y = self.character_position(i, side)
+            if side:
+                color.rgba = (0.3, 0.7, 0.3, 0.8)  # Green for target side
+            else:
+                color.rgba = (0.7, 0.7, 0.3, 0.8)  # Yellow for starting side
+            circle.pos = (x - radius, y - radius)
+            circle.size = (2 * radius, 2 * radius)
+            glyph.pos = (x - glyph.size[0] / 2, y - glyph.size[1] / 2)
+
+    def character_grid(self):
+        # Two to a row like the original layout, squeezed into more columns
+        # and tighter rows once a bigger puzzle needs them
+        river_x, river_width = self.river_geometry()
+        count = len(self.rules.names)
+        columns = max(2, -(-count // 3))
+        rows = -(-count // columns)
+        step_x = min(100, max(20, (river_x - self.x - 80) / (columns - 1)))
+        step_y = min(120, max(20, (self.height - 130) / max(1, rows - 1)))
+        return columns, step_x, step_y
+
+    def character_radius(self):
+        _, step_x, step_y = self.character_grid()
+        return min(30, step_x / 2 - 2, step_y / 2 - 2)
+
+    def character_position(self, slot, right_side):
+        river_x, river_width = self.river_geometry()
+        columns, step_x, step_y = self.character_grid()
+        row, column = divmod(slot, columns)
+        bank_x = river_x + river_width if right_side else self.x
+        return bank_x + 50 + column * step_x, self.y + 100 + row * step_y
+
+
+class SolverWorker:
+    # Runs a search on a background thread so Kivy's event loop and its
+    # animations keep going. Progress and the result are posted back to the
+    # UI thread with Clock.schedule_once; the callbacks get the worker first
+    # so the app can ignore workers it has already cancelled.
+    def __init__(self, rules, start, goal, on_progress, on_solved, on_cancelled, method="bfs"):
+        self.rules = rules
+        self.start_mask = start
+        self.goal_mask = goal
+        self.method = method
+        self.on_progress = on_progress
+        self.on_solved = on_solved
+        self.on_cancelled = on_cancelled
+        self.cancel_event = threading.Event()
+        self.started = time.perf_counter()
+        self.seconds = None  # Time the search took, once it's solved
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def cancel(self):
+        # The search stops at its next layer
+        self.cancel_event.set()
+
+    def run(self):
+        stats = core.SearchStats(on_layer=self.report_progress)
+        try:
+            path = shared_cache().solve(self.rules, self.start_mask, self.goal_mask, self.method, stats)
+        except core.SearchCancelled:
+            Clock.schedule_once(lambda dt: self.on_cancelled(self))
+            return
+        # Wall time, so answers straight from the cache count too
+        self.seconds = time.perf_counter() - self.started
+        Clock.schedule_once(lambda dt: self.on_solved(self, path))
 
-                # Store position for character rendering
-                self.character_positions[name] = (x, y, emoji)
+    def report_progress(self, stats):
+        if self.cancel_event.is_set():
+            raise core.SearchCancelled()
+        expanded, depth, frontier = stats.expanded, stats.depth, stats.frontier
+        elapsed = time.perf_counter() - self.started
+        Clock.schedule_once(lambda dt: self.on_progress(self, expanded, depth, frontier, elapsed))
 
 
 class RiverCrossingApp(App):
@@ -109,12 +247,16 @@ class RiverCrossingApp(App):
         self.title = "River Crossing Puzzle - Premium Edition"
 
         # Game logic
+        self.rules = core.CLASSIC
         self.current_state = (False, False, False, False)
         self.start_state = (False, False, False, False)
         self.goal_state = (True, True, True, True)
         self.solution_path = []
         self.current_step = 0
         self.solving = False
+        self.solver = None  # SolverWorker of the search in progress
+        self.animation_event = None  # Next scheduled auto-solve step
+        self.frame_stats = frame_stats.from_environment()
 
         # Main layout
         main_layout = BoxLayout(orientation='vertical', padding=20, spacing=15)
@@ -181,89 +323,136 @@ class RiverCrossingApp(App):
                                   color=[0.2, 0.4, 0.2, 1])
         main_layout.add_widget(self.status_label)
 
+        if self.frame_stats is not None:
+            self.start_frame_stats()
+
         # Initial render
         Clock.schedule_once(lambda dt: self.update_display(), 0.1)
 
         return main_layout
 
-    def is_valid(self, state):
-        farmer, lion, goat, grass = state
-        if lion == goat and farmer != goat:
-            return False
-        if goat == grass and farmer != goat:
-            return False
-        return True
-
-    def generate_moves(self, state):
-        farmer, lion, goat, grass = state
-        moves = []
-
-        # Farmer takes goat
-        if farmer == goat:
-            new_state = (not farmer, lion, not goat, grass)
-            if self.is_valid(new_state):
-                moves.append(new_state)
-
-        # Farmer takes lion
-        if farmer == lion:
-            new_state = (not farmer, not lion, goat, grass)
-            if self.is_valid(new_state):
-                moves.append(new_state)
-
-        # Farmer takes grass
-        if farmer == grass:
-            new_state = (not farmer, lion, goat, not grass)
-            if self.is_valid(new_state):
-                moves.append(new_state)
-
-        # Farmer goes alone
-        new_state = (not farmer, lion, goat, grass)
-        if self.is_valid(new_state):
-            moves.append(new_state)
-
-        return moves
-
-    def bfs_solve(self):
-        visited = set()
-        q = queue.Queue()
-        q.put((self.start_state, [self.start_state]))
-
-        while not q.empty():
-            state, path = q.get()
-            if state == self.goal_state:
-                return path
-
-            visited.add(state)
-            for move in self.generate_moves(state):
-                if move not in visited:
-                    q.put((move, path + [move]))
-        return None
+    def start_frame_stats(self):
+        # Paint time is the window's own draw of a frame: from on_draw, before
+        # the canvas instructions are rendered, to on_flip, before the swap
+        self.frame_started = None
+        Window.bind(on_draw=self.on_frame_start, on_flip=self.on_frame_drawn)
+
+        # Rolling percentiles in the canvas' top left corner
+        self.stats_overlay = Label(font_size='11sp', font_name='RobotoMono-Regular',
+                                   color=[0.1, 0.1, 0.1, 1], halign='left', size_hint=(None, None))
+        self.stats_overlay.bind(texture_size=self.place_stats_overlay)
+        self.canvas_widget.bind(pos=self.place_stats_overlay, size=self.place_stats_overlay)
+        self.canvas_widget.add_widget(self.stats_overlay)
+        self.overlay_refreshed = 0
+
+        # A fast repeating Clock event whose lateness shows how busy the loop is
+        Clock.schedule_interval(self.on_stats_probe, frame_stats.PROBE_INTERVAL)
+
+    def place_stats_overlay(self, *args):
+        self.stats_overlay.size = self.stats_overlay.texture_size
+        self.stats_overlay.pos = (self.canvas_widget.x + 8,
+                                  self.canvas_widget.top - self.stats_overlay.height - 8)
+
+    def on_frame_start(self, *args):
+        self.frame_started = time.perf_counter()
+
+    def on_frame_drawn(self, *args):
+        if self.frame_started is not None:
+            self.frame_stats.record("paint", (time.perf_counter() - self.frame_started) * 1000)
+            self.frame_started = None
+
+    def on_stats_probe(self, dt):
+        self.frame_stats.tick("timer jitter", frame_stats.PROBE_INTERVAL)
+        now = time.perf_counter()
+        if now - self.overlay_refreshed >= frame_stats.OVERLAY_INTERVAL:
+            self.overlay_refreshed = now
+            self.stats_overlay.text = self.frame_stats.overlay_text()
+
+    def on_stop(self):
+        if self.frame_stats is not None:
+            self.frame_stats.dump_csv()
 
     def find_solution(self, instance):
-        self.solution_path = self.bfs_solve()
-        if self.solution_path:
-            self.current_step = 0
-            self.status_label.text = f'✅ Solution found! {len(self.solution_path)} steps total'
-            self.current_state = self.solution_path[0]
-            self.update_display()
-        else:
+        if self.solver is not None:
+            self.cancel_solver()
+            return
+        self.start_solver()
+
+    def start_solver(self):
+        self.cancel_solver()
+        # Puzzles solved before, in any frontend, come straight from the cache
+        self.solver = SolverWorker(self.rules, self.rules.encode(self.start_state),
+                                   self.rules.encode(self.goal_state),
+                                   self.on_solver_progress, self.on_solver_solved, self.on_solver_cancelled)
+        self.find_btn.text = '⏹️ Cancel Search'
+        self.auto_btn.text = '⏹️ Cancel Search'
+        self.status_label.text = '🔍 Searching...'
+        self.solver.start()
+
+    def cancel_solver(self):
+        if self.solver is None:
+            return
+        self.solver.cancel()
+        self.solver = None
+        self.find_btn.text = '🔍 Find Solution'
+        self.auto_btn.text = "▶️ Auto Solve"
+
+    def on_solver_progress(self, worker, expanded, depth, frontier, elapsed):
+        if worker is not self.solver:
+            return
+        self.status_label.text = (f'🔍 Searching... depth {depth} · {expanded:,} expanded · '
+                                  f'{frontier:,} in frontier · {elapsed:.1f}s')
+
+    def on_solver_cancelled(self, worker):
+        if self.solver is None:
+            self.status_label.text = '⏹️ Search cancelled'
+
+    def on_solver_solved(self, worker, path):
+        if worker is not self.solver:
+            return
+        self.solver = None
+        self.find_btn.text = '🔍 Find Solution'
+        self.auto_btn.text = "▶️ Auto Solve"
+        if self.frame_stats is not None:
+            self.frame_stats.record("solver", worker.seconds * 1000)
+
+        if path is None:
+            self.solution_path = []
             self.show_popup("No Solution", "No solution found for this puzzle!")
+            return
+        self.solution_path = [self.rules.decode(mask) for mask in path]
+        self.current_step = 0
+        self.status_label.text = f'✅ Solution found! {len(self.solution_path)} steps total'
+        self.current_state = self.solution_path[0]
+        self.update_display()
 
     def auto_solve(self, instance):
-        if not self.solution_path:
-            self.find_solution(instance)
+        # While searching or animating, the button cancels instead
+        if self.solver is not None:
+            self.cancel_solver()
             return
-
         if self.solving:
+            self.stop_animation()
+            self.status_label.text = '⏹️ Auto solve stopped'
+            return
+
+        if not self.solution_path:
+            self.start_solver()
             return
 
         self.solving = True
-        self.auto_btn.text = "⏸️ Solving..."
-        self.auto_btn.disabled = True
+        self.auto_btn.text = "⏹️ Stop"
 
         # Animate through solution
         self.animate_solution()
 
+    def stop_animation(self):
+        if self.animation_event is not None:
+            self.animation_event.cancel()
+            self.animation_event = None
+        self.solving = False
+        self.auto_btn.text = "▶️ Auto Solve"
+
     def animate_solution(self):
         if self.current_step < len(self.solution_path) - 1:
             self.current_step += 1
@@ -272,12 +461,10 @@ class RiverCrossingApp(App):
             self.status_label.text = f'🎬 Step {self.current_step + 1} of {len(self.solution_path)}'
 
             # Schedule next step
-            Clock.schedule_once(lambda dt: self.animate_solution(), 1.5)
+            self.animation_event = Clock.schedule_once(lambda dt: self.animate_solution(), 1.5)
         else:
             # Finished
-            self.solving = False
-            self.auto_btn.text = "▶️ Auto Solve"
-            self.auto_btn.disabled = False
+            self.stop_animation()
             self.status_label.text = '🎉 Puzzle Solved! Everyone safely across! 🎉'
             self.show_popup("🎉 Congratulations! 🎉", "You've successfully solved the river crossing puzzle!")
 
@@ -300,21 +487,23 @@ class RiverCrossingApp(App):
             self.status_label.text = '✅ Puzzle already completed!'
 
     def reset_game(self, instance):
+        self.cancel_solver()
+        self.stop_animation()
         self.current_state = self.start_state
         self.solution_path = []
         self.current_step = 0
-        self.solving = False
-        self.auto_btn.text = "▶️ Auto Solve"
-        self.auto_btn.disabled = False
         self.status_label.text = '🔄 Game reset! Ready to solve!'
         self.update_display()
 
     def update_display(self):
-        self.canvas_widget.game_state = self.current_state
-        self.canvas_widget.update_graphics()
+        if self.frame_stats is None:
+            self.canvas_widget.set_game_state(self.current_state)
+        else:
+            with self.frame_stats.measure("update_display"):
+                self.canvas_widget.set_game_state(self.current_state)
 
         # Add validation warning
-        if not self.is_valid(self.current_state):
+        if not self.rules.state_is_valid(self.current_state):
             self.status_label.text = '⚠️ INVALID STATE! Someone will be eaten! ⚠️'
             self.status_label.color = [1, 0.2, 0.2, 1]  # Red
         else:
@@ -332,15 +521,5 @@ class RiverCrossingApp(App):
         popup.open()
 
 
-# Character rendering widget
-class CharacterWidget(Label):
-    def __init__(self, emoji, name, **kwargs):
-        super().__init__(**kwargs)
-        self.text = emoji
-        self.font_size = '32sp'
-        self.size_hint = (None, None)
-        self.size = (60, 60)
-
-
 if __name__ == '__main__':
     RiverCrossingApp().run()
\ No newline at end of file
@@ -1,25 +1,242 @@
 import sys
-import queue
+import time
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QPushButton, QLabel, QFrame, QMessageBox)
-from PyQt5.QtCore import Qt, QTimer, QPropertyAnimation, QRect, pyqtSignal
-from PyQt5.QtGui import QPainter, QPen, QBrush, QColor, QFont, QLinearGradient
+from PyQt5.QtCore import Qt, QTimer, QPropertyAnimation, QPointF, QRect, QRectF, QSize, pyqtSignal
+from PyQt5.QtGui import (QPainter, QPen, QBrush, QColor, QFont, QFontDatabase, QFontMetrics,
+                         QLinearGradient, QPixmap, QRegion)
 from PyQt5.QtCore import QThread
 
+import frame_stats
+import river_crossing_core as core
+from solution_cache import shared_cache
+
+
+# Emoji and circle colour per entity; anyone else is drawn with an initial
+CHARACTER_STYLES = {
+    "Farmer": (core.EMOJI["Farmer"], (70, 130, 180)),
+    "Lion": (core.EMOJI["Lion"], (255, 165, 0)),
+    "Goat": (core.EMOJI["Goat"], (169, 169, 169)),
+    "Grass": (core.EMOJI["Grass"], (154, 205, 50)),
+}
+DEFAULT_CHARACTER_COLOR = (147, 112, 219)
+
+# Colour emoji fonts on Linux, macOS and Windows, tried in order
+EMOJI_FAMILIES = ("Noto Color Emoji", "Apple Color Emoji", "Segoe UI Emoji", "Twemoji", "EmojiOne Color")
+# Joiners and variation selectors have no glyph of their own
+EMOJI_MODIFIERS = "\u200d\ufe0e\ufe0f"
+
+
+def find_emoji_family():
+    families = set(QFontDatabase().families())
+    return next((family for family in EMOJI_FAMILIES if family in families), None)
+
+
+class PaintResources:
+    # Pens, fonts and sprites for the moving part of the scene. Built once
+    # per character size, pixel ratio and theme, so a paint only blits and
+    # never allocates Qt objects. The emoji are rasterised into the sprites
+    # here too, so glyphs are shaped once rather than on every paint; with
+    # no emoji font installed a character shows its initial instead of a box.
+    def __init__(self, names, cell, ratio, theme):
+        self.key = (names, cell, ratio, id(theme))
+        scale = cell / 80
+        # Leave room below each circle for its name before the next row starts
+        self.radius = max(8, round(32 * scale))
+
+        family = find_emoji_family()
+        self.emoji_font = QFont(family) if family else None
+        if self.emoji_font is not None:
+            self.emoji_font.setPixelSize(max(6, round(self.radius * 1.1)))
+        self.initial_font = QFont("Arial")
+        self.initial_font.setBold(True)
+        self.initial_font.setPixelSize(max(6, self.radius))
+        self.warning_font = QFont("Arial", 14, QFont.Bold)
+        self.warning_pen = QPen(QColor(255, 0, 0), 3)
+        self.label_font = QFont("Arial", max(6, round(10 * scale)), QFont.Bold)
+
+        # Every sprite has the same box around the character's centre, wide
+        # enough for the longest name underneath the circle
+        metrics = QFontMetrics(self.label_font)
+        width = max([2 * self.radius + 8] + [metrics.horizontalAdvance(name) + 4 for name in names])
+        self.sprite_rect = QRect(-(width // 2), -(self.radius + 4), width,
+                                 2 * self.radius + 5 + metrics.height())
+
+        self.boat = self.render_boat(ratio)
+        self.sprites = []
+        for name in names:
+            glyph, rgb = theme.get(name, (None, DEFAULT_CHARACTER_COLOR))
+            self.sprites.append(self.render_sprite(name, glyph, QColor(*rgb), ratio))
+
+    def has_emoji(self, glyph):
+        if glyph is None or self.emoji_font is None:
+            return False
+        metrics = QFontMetrics(self.emoji_font)
+        return all(metrics.inFontUcs4(ord(char)) for char in glyph if char not in EMOJI_MODIFIERS)
+
+    def new_pixmap(self, size, ratio):
+        pixmap = QPixmap(size * ratio)
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.transparent)
+        return pixmap
+
+    def render_sprite(self, name, glyph, color, ratio):
+        rect = self.sprite_rect
+        pixmap = self.new_pixmap(rect.size(), ratio)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        center = QPointF(-rect.x(), -rect.y())
+        r = self.radius
+
+        # Character background circle
+        gradient = QLinearGradient(center.x() - r * 6 / 7, center.y() - r * 6 / 7,
+                                   center.x() + r * 6 / 7, center.y() + r * 6 / 7)
+        gradient.setColorAt(0, color.lighter(150))
+        gradient.setColorAt(1, color.darker(120))
+        painter.setBrush(QBrush(gradient))
+        painter.setPen(QPen(color.darker(150), 3))
+        painter.drawEllipse(center, r, r)
+
+        # Character emoji, or its initial when there's no emoji to draw
+        painter.setPen(QPen(QColor(255, 255, 255), 2))
+        if self.has_emoji(glyph):
+            painter.setFont(self.emoji_font)
+        else:
+            painter.setFont(self.initial_font)
+            glyph = name[:1]
+        painter.drawText(QRectF(center.x() - r, center.y() - r, 2 * r, 2 * r), Qt.AlignCenter, glyph)
+
+        # Character name
+        painter.setFont(self.label_font)
+        painter.drawText(QRectF(0, center.y() + r + 1, rect.width(), rect.height()),
+                         Qt.AlignHCenter | Qt.AlignTop, name)
+        painter.end()
+        return pixmap
+
+    def render_boat(self, ratio):
+        pixmap = self.new_pixmap(QSize(66, 36), ratio)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        # Boat shadow
+        painter.setPen(QPen(QColor(0, 0, 0, 50)))
+        painter.setBrush(QBrush(QColor(0, 0, 0, 50)))
+        painter.drawEllipse(3, 3, 60, 30)
+
+        # Boat
+        boat_gradient = QLinearGradient(1, 1, 1, 31)
+        boat_gradient.setColorAt(0, QColor(139, 69, 19))  # Saddle brown
+        boat_gradient.setColorAt(1, QColor(101, 67, 33))  # Dark brown
+        painter.setBrush(QBrush(boat_gradient))
+        painter.setPen(QPen(QColor(62, 39, 35), 2))
+        painter.drawEllipse(1, 1, 60, 30)
+        painter.end()
+        return pixmap
+
 
 class GameCanvas(QWidget):
     def __init__(self):
         super().__init__()
+        self.rules = core.CLASSIC
         self.game_state = (False, False, False, False)  # farmer, lion, goat, grass
         self.setMinimumHeight(400)
-        self.character_positions = {}
+        self.theme = CHARACTER_STYLES
+        self.background = None  # Static scene, rendered once per size
+        self._slot_layout = None  # (key, cell size, left positions, right positions)
+        self.resources = None  # PaintResources for the current layout
+        self.frame_stats = None  # FrameStats when timing is switched on
 
     def set_game_state(self, state):
-        self.game_state = state
-        self.update()
+        # A state from different rules shares no layout with the new one
+        if len(state) != len(self.game_state):
+            self.game_state = state
+            self.update()
+            return
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
+        # Repaint only where the boat, characters or warning actually changed
+        old_rects = self.dynamic_rects(self.game_state)
+        self.game_state = state
+        new_rects = self.dynamic_rects(state)
+        dirty = QRegion()
+        for key in old_rects.keys() | new_rects.keys():
+            old_rect, new_rect = old_rects.get(key), new_rects.get(key)
+            if old_rect != new_rect:
+                for rect in (old_rect, new_rect):
+                    if rect is not None:
+                        dirty += rect
+        if not dirty.isEmpty():
+            self.update(dirty)
+
+    def resizeEvent(self, event):
+        self.background = None
+        super().resizeEvent(event)
+
+    def river_geometry(self):
+        river_width = self.width() // 4
+        river_x = self.width() // 2 - river_width // 2
+        return river_x, river_width
+
+    def boat_position(self, state):
+        river_x, river_width = self.river_geometry()
+        boat_x = river_x + river_width - 80 if state[self.rules.boat_index] else river_x + 40
+        return boat_x, self.height() // 2 - 15
+
+    def character_layout(self):
+        # Every entity has a fixed slot on each bank. The grid gets as many
+        # rows as fit and shrinks the characters once a bank runs out of room.
+        names = self.rules.names
+        key = (self.width(), self.height(), names)
+        if self._slot_layout is None or self._slot_layout[0] != key:
+            river_x, river_width = self.river_geometry()
+            bank_width = min(river_x - 40, self.width() - 80 - river_x - river_width)
+            bank_height = self.height() - 80
+            count = max(1, len(names))
+            cell, rows = 0, 1
+            for row_count in range(1, count + 1):
+                columns = -(-count // row_count)
+                size = min(80, bank_width // columns, bank_height // row_count)
+                if size >= cell:
+                    cell, rows = size, row_count
+            cell = max(cell, 20)
+
+            left, right = [], []
+            for i in range(len(names)):
+                column, row = divmod(i, rows)
+                offset = cell // 2 + column * cell
+                y = 40 + cell // 2 + row * cell
+                left.append((40 + offset, y))
+                right.append((self.width() - 80 - offset, y))
+            self._slot_layout = (key, cell, left, right)
+        return self._slot_layout
+
+    def paint_resources(self):
+        _, cell, _, _ = self.character_layout()
+        key = (self.rules.names, cell, self.devicePixelRatioF(), id(self.theme))
+        if self.resources is None or self.resources.key != key:
+            self.resources = PaintResources(self.rules.names, cell, self.devicePixelRatioF(), self.theme)
+        return self.resources
+
+    def dynamic_rects(self, state):
+        # Areas painted on top of the background for a state, keyed so two
+        # states can be compared piece by piece
+        resources = self.paint_resources()
+        _, _, left, right = self.character_layout()
+        boat_x, boat_y = self.boat_position(state)
+        rects = {"boat": QRect(boat_x - 1, boat_y - 1, 66, 36)}
+        for i in range(len(self.rules.names)):
+            x, y = right[i] if state[i] else left[i]
+            rects[i] = resources.sprite_rect.translated(x, y)
+        if not self.rules.state_is_valid(state):
+            rects["warning"] = QRect(self.width() // 2 - 105, self.height() - 45, 240, 35)
+        return rects
+
+    def render_background(self):
+        # Banks, river, waves and labels only change with the widget size,
+        # so they are drawn into a pixmap at the screen's pixel ratio once
+        ratio = self.devicePixelRatioF()
+        pixmap = QPixmap(self.size() * ratio)
+        pixmap.setDevicePixelRatio(ratio)
+        painter = QPainter(pixmap)
         painter.setRenderHint(QPainter.Antialiasing)
 
         # Background gradient
@@ -29,8 +246,7 @@ class GameCanvas(QWidget):
         painter.fillRect(self.rect(), QBrush(gradient))
 
         # River
-        river_width = self.width() // 4
-        river_x = self.width() // 2 - river_width // 2
+        river_x, river_width = self.river_geometry()
 
         # River gradient
         river_gradient = QLinearGradient(river_x, 0, river_x + river_width, 0)
@@ -65,107 +281,105 @@ class GameCanvas(QWidget):
         painter.setFont(QFont("Arial", 16, QFont.Bold))
         painter.drawText(20, 30, "🏠 Starting Side")
         painter.drawText(self.width() - 150, 30, "🎯 Target Side")
+        painter.end()
+        return pixmap
 
-        # Boat
-        farmer, lion, goat, grass = self.game_state
-        boat_x = river_x + 40 if not farmer else river_x + river_width - 80
-        boat_y = self.height() // 2 - 15
+    def paintEvent(self, event):
+        if self.frame_stats is None:
+            self.paint_scene(event)
+        else:
+            with self.frame_stats.measure("paint"):
+                self.paint_scene(event)
 
-        # Boat shadow
-        painter.setPen(QPen(QColor(0, 0, 0, 50)))
-        painter.setBrush(QBrush(QColor(0, 0, 0, 50)))
-        painter.drawEllipse(boat_x + 2, boat_y + 2, 60, 30)
+    def paint_scene(self, event):
+        # Moving to a screen with another pixel ratio needs a sharper pixmap
+        if self.background is None or self.background.devicePixelRatio() != self.devicePixelRatioF():
+            self.background = self.render_background()
+
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        dirty = event.rect()
+        ratio = self.background.devicePixelRatio()
+        painter.drawPixmap(QRectF(dirty), self.background,
+                           QRectF(dirty.x() * ratio, dirty.y() * ratio,
+                                  dirty.width() * ratio, dirty.height() * ratio))
+
+        resources = self.paint_resources()
 
         # Boat
-        boat_gradient = QLinearGradient(boat_x, boat_y, boat_x, boat_y + 30)
-        boat_gradient.setColorAt(0, QColor(139, 69, 19))  # Saddle brown
-        boat_gradient.setColorAt(1, QColor(101, 67, 33))  # Dark brown
-        painter.setBrush(QBrush(boat_gradient))
-        painter.setPen(QPen(QColor(62, 39, 35), 2))
-        painter.drawEllipse(boat_x, boat_y, 60, 30)
+        boat_x, boat_y = self.boat_position(self.game_state)
+        painter.drawPixmap(boat_x - 1, boat_y - 1, resources.boat)
 
-        self.draw_characters(painter, river_x, river_width)
+        self.draw_characters(painter, resources)
 
         # Invalid state warning
-        if not self.is_valid(self.game_state):
-            painter.setPen(QPen(QColor(255, 0, 0), 3))
-            painter.setFont(QFont("Arial", 14, QFont.Bold))
+        if not self.rules.state_is_valid(self.game_state):
+            painter.setPen(resources.warning_pen)
+            painter.setFont(resources.warning_font)
             painter.drawText(self.width() // 2 - 100, self.height() - 20, "⚠️ INVALID STATE! ⚠️")
 
-    def draw_characters(self, painter, river_x, river_width):
-        farmer, lion, goat, grass = self.game_state
-
-        characters = [
-            ("👨‍🌾", "Farmer", farmer, QColor(70, 130, 180)),
-            ("🦁", "Lion", lion, QColor(255, 165, 0)),
-            ("🐐", "Goat", goat, QColor(169, 169, 169)),
-            ("🌾", "Grass", grass, QColor(154, 205, 50))
-        ]
-
-        left_positions = [(80, 80), (80, 160), (80, 240), (80, 320)]
-        right_positions = [(self.width() - 120, 80), (self.width() - 120, 160),
-                           (self.width() - 120, 240), (self.width() - 120, 320)]
-
-        left_idx = 0
-        right_idx = 0
-
-        for emoji, name, side, color in characters:
-            if side:  # Right side
-                if right_idx < len(right_positions):
-                    x, y = right_positions[right_idx]
-                    right_idx += 1
-                else:
-                    continue
-            else:  # Left side
-                if left_idx < len(left_positions):
-                    x, y = left_positions[left_idx]
-                    left_idx += 1
-                else:
-                    continue
-
-            # Character background circle
-            gradient = QLinearGradient(x - 30, y - 30, x + 30, y + 30)
-            gradient.setColorAt(0, color.lighter(150))
-            gradient.setColorAt(1, color.darker(120))
-
-            painter.setBrush(QBrush(gradient))
-            painter.setPen(QPen(color.darker(150), 3))
-            painter.drawEllipse(x - 35, y - 35, 70, 70)
-
-            # Character emoji/text
-            painter.setPen(QPen(QColor(255, 255, 255), 2))
-            painter.setFont(QFont("Arial", 24))
-
-            # Draw emoji or fallback text
-            if emoji in ["👨‍🌾", "🦁", "🐐", "🌾"]:
-                painter.drawText(x - 15, y + 8, emoji)
-            else:
-                painter.drawText(x - 20, y + 8, name[:1])  # First letter fallback
+    def draw_characters(self, painter, resources):
+        _, _, left, right = self.character_layout()
+        state = self.game_state
+        sprite_x = resources.sprite_rect.x()
+        sprite_y = resources.sprite_rect.y()
+
+        # Character circles, emoji and names
+        for i, sprite in enumerate(resources.sprites):
+            x, y = right[i] if state[i] else left[i]
+            painter.drawPixmap(x + sprite_x, y + sprite_y, sprite)
+
+
+class SolverThread(QThread):
+    # Runs a search off the GUI thread. Signals are queued back to the
+    # window, so painting never waits on the solver.
+    progress = pyqtSignal('qlonglong', int, 'qlonglong')  # Nodes expanded, depth, frontier size
+    solved = pyqtSignal(object)  # List of state masks, or None
+    cancelled = pyqtSignal()
+
+    def __init__(self, rules, start, goal, method="bfs", parent=None):
+        super().__init__(parent)
+        self.rules = rules
+        self.start_mask = start
+        self.goal_mask = goal
+        self.method = method
+        self.seconds = None  # Time the search took, once it's solved
+
+    def run(self):
+        stats = core.SearchStats(on_layer=self.report_progress)
+        started = time.perf_counter()
+        try:
+            path = shared_cache().solve(self.rules, self.start_mask, self.goal_mask, self.method, stats)
+        except core.SearchCancelled:
+            self.cancelled.emit()
+            return
+        # Wall time, so answers straight from the cache count too
+        self.seconds = time.perf_counter() - started
+        self.solved.emit(path)
 
-            # Character name
-            painter.setFont(QFont("Arial", 10, QFont.Bold))
-            painter.drawText(x - 25, y + 50, name)
-
-    def is_valid(self, state):
-        farmer, lion, goat, grass = state
-        if lion == goat and farmer != goat:
-            return False
-        if goat == grass and farmer != goat:
-            return False
-        return True
+    def report_progress(self, stats):
+        # Called by the solver at every new layer, on this thread
+        if self.isInterruptionRequested():
+            raise core.SearchCancelled()
+        self.progress.emit(stats.expanded, stats.depth, stats.frontier)
 
 
 class RiverCrossingPuzzle(QMainWindow):
     def __init__(self):
         super().__init__()
+        self.rules = core.CLASSIC
         self.current_state = (False, False, False, False)
         self.start_state = (False, False, False, False)
         self.goal_state = (True, True, True, True)
         self.solution_path = []
         self.current_step = 0
         self.solving = False
+        self.solver = None  # SolverThread of the search in progress
+        self.frame_stats = frame_stats.from_environment()
 
         self.init_ui()
+        if self.frame_stats is not None:
+            self.start_frame_stats()
 
     def init_ui(self):
         self.setWindowTitle("🌊 River Crossing Puzzle - Premium Edition")
@@ -329,72 +543,98 @@ class RiverCrossingPuzzle(QMainWindow):
 
         self.update_display()
 
-    def is_valid(self, state):
-        farmer, lion, goat, grass = state
-        if lion == goat and farmer != goat:
-            return False
-        if goat == grass and farmer != goat:
-            return False
-        return True
-
-    def generate_moves(self, state):
-        farmer, lion, goat, grass = state
-        moves = []
-
-        # Farmer takes goat
-        if farmer == goat:
-            new_state = (not farmer, lion, not goat, grass)
-            if self.is_valid(new_state):
-                moves.append(new_state)
-
-        # Farmer takes lion
-        if farmer == lion:
-            new_state = (not farmer, not lion, goat, grass)
-            if self.is_valid(new_state):
-                moves.append(new_state)
-
-        # Farmer takes grass
-        if farmer == grass:
-            new_state = (not farmer, lion, goat, not grass)
-            if self.is_valid(new_state):
-                moves.append(new_state)
-
-        # Farmer goes alone
-        new_state = (not farmer, lion, goat, grass)
-        if self.is_valid(new_state):
-            moves.append(new_state)
-
-        return moves
-
-    def bfs_solve(self):
-        visited = set()
-        q = queue.Queue()
-        q.put((self.start_state, [self.start_state]))
-
-        while not q.empty():
-            state, path = q.get()
-            if state == self.goal_state:
-                return path
-
-            visited.add(state)
-            for move in self.generate_moves(state):
-                if move not in visited:
-                    q.put((move, path + [move]))
-        return None
+    def start_frame_stats(self):
+        self.canvas.frame_stats = self.frame_stats
+
+        # Rolling percentiles in the canvas' top left corner
+        self.stats_overlay = QLabel(self.canvas)
+        self.stats_overlay.setStyleSheet("""
+            font-family: monospace;
+            font-size: 11px;
+            color: white;
+            background: rgba(0, 0, 0, 0.6);
+            padding: 4px;
+        """)
+        self.stats_overlay.move(8, 8)
+        self.stats_overlay.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.stats_overlay.show()
+
+        # A fast repeating timer whose lateness shows how busy the event loop is
+        self.stats_probe = QTimer(self)
+        self.stats_probe.setTimerType(Qt.PreciseTimer)
+        self.stats_probe.timeout.connect(self.on_stats_probe)
+        self.stats_probe.start(round(frame_stats.PROBE_INTERVAL * 1000))
+        self.overlay_refreshed = 0
+
+    def on_stats_probe(self):
+        self.frame_stats.tick("timer jitter", frame_stats.PROBE_INTERVAL)
+        now = time.perf_counter()
+        if now - self.overlay_refreshed >= frame_stats.OVERLAY_INTERVAL:
+            self.overlay_refreshed = now
+            self.stats_overlay.setText(self.frame_stats.overlay_text())
+            self.stats_overlay.adjustSize()
 
     def find_solution(self):
-        self.solution_path = self.bfs_solve()
-        if self.solution_path:
-            self.current_step = 0
-            self.status_label.setText(f"✅ Solution found! {len(self.solution_path)} steps total")
-            self.current_state = self.solution_path[0]
-            self.update_display()
-        else:
+        # The same button cancels a search that is still running
+        if self.solver is not None:
+            self.cancel_solver()
+            return
+        self.start_solver()
+
+    def start_solver(self):
+        self.cancel_solver()
+        # Puzzles solved before, in any frontend, come straight from the cache
+        solver = SolverThread(self.rules, self.rules.encode(self.start_state),
+                              self.rules.encode(self.goal_state), parent=self)
+        solver.progress.connect(self.on_solver_progress)
+        solver.solved.connect(self.on_solver_solved)
+        solver.cancelled.connect(self.on_solver_cancelled)
+        solver.finished.connect(solver.deleteLater)
+        self.solver = solver
+        self.find_btn.setText("⏹️ Cancel Search")
+        self.status_label.setText("🔍 Searching...")
+        solver.start()
+
+    def cancel_solver(self):
+        if self.solver is None:
+            return
+        # The thread stops at its next layer; anything it still emits is ignored
+        self.solver.requestInterruption()
+        self.solver = None
+        self.find_btn.setText("🔍 Find Solution")
+
+    def on_solver_progress(self, expanded, depth, frontier):
+        if self.sender() is not self.solver:
+            return
+        self.status_label.setText(
+            f"🔍 Searching... depth {depth}, {expanded:,} expanded, {frontier:,} in frontier")
+
+    def on_solver_cancelled(self):
+        if self.solver is None:
+            self.status_label.setText("⏹️ Search cancelled")
+
+    def on_solver_solved(self, path):
+        if self.sender() is not self.solver:
+            return
+        self.solver = None
+        self.find_btn.setText("🔍 Find Solution")
+        if self.frame_stats is not None:
+            self.frame_stats.record("solver", self.sender().seconds * 1000)
+
+        if path is None:
+            self.solution_path = []
             QMessageBox.information(self, "No Solution", "No solution found for this puzzle!")
+            return
+        self.solution_path = [self.rules.decode(mask) for mask in path]
+        self.current_step = 0
+        self.status_label.setText(f"✅ Solution found! {len(self.solution_path)} steps total")
+        self.current_state = self.solution_path[0]
+        self.update_display()
 
     def auto_solve(self):
         if not self.solution_path:
-            self.find_solution()
+            if self.solver is None:
+                self.start_solver()
             return
 
         if self.solving:
@@ -442,6 +682,7 @@ class RiverCrossingPuzzle(QMainWindow):
 
     def reset_game(self):
         self.solve_timer.stop()
+        self.cancel_solver()
         self.current_state = self.start_state
         self.solution_path = []
         self.current_step = 0
@@ -452,7 +693,21 @@ class RiverCrossingPuzzle(QMainWindow):
         self.update_display()
 
     def update_display(self):
-        self.canvas.set_game_state(self.current_state)
+        if self.frame_stats is None:
+            self.canvas.set_game_state(self.current_state)
+        else:
+            with self.frame_stats.measure("update_display"):
+                self.canvas.set_game_state(self.current_state)
+
+    def closeEvent(self, event):
+        # Let cancelled searches wind down before their QThreads are destroyed
+        self.cancel_solver()
+        for solver in self.findChildren(SolverThread):
+            solver.requestInterruption()
+            solver.wait()
+        if self.frame_stats is not None:
+            self.frame_stats.dump_csv()
+        super().closeEvent(event)
 
 
 def main():
@@ -0,0 +1,135 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+import river_crossing_core as core
+
+# Headless batch solver: reads one puzzle per line (JSON, in the PuzzleSpec
+# or MultisetSpec format plus optional "id", "start", "goal" and "method",
+# and for iddfs/idastar "table_size" and "max_expanded"),
+# fans the puzzles out over a process pool and writes one JSON result per
+# line as each chunk finishes. Only a few chunks are ever held in memory,
+# whatever the batch size. A line that can't be solved gets an "error" in
+# its result instead of stopping the batch.
+#
+#   python batch_solve.py puzzles.jsonl --workers 8 --chunk-size 64 > results.jsonl
+#   cat puzzles.jsonl | python batch_solve.py - --method astar
+
+
+def parse_state(sides, rules):
+    if len(sides) != rules.size:
+        raise ValueError(f"State needs {rules.size} sides, got {len(sides)}")
+    return rules.encode(sides)
+
+
+def solve_line(line_number, line, method):
+    result = {"line": line_number}
+    try:
+        data = json.loads(line)
+        if not isinstance(data, dict):
+            raise ValueError(f"Expected a JSON object, got {type(data).__name__}")
+        result["id"] = data.get("id")
+        rules = core.spec_from_dict(data).compile()
+        # States come in the same tuple-of-bools form the GUIs draw from
+        start = parse_state(data["start"], rules) if "start" in data else rules.start
+        goal = parse_state(data["goal"], rules) if "goal" in data else rules.goal
+
+        method = data.get("method", method)
+        options = {}
+        if method in core.DEPTH_FIRST_SOLVERS:
+            # Bounded, so one puzzle can't hold up its worker forever
+            options["table_size"] = data.get("table_size", core.DEPTH_FIRST_TABLE_SIZE)
+            options["max_expanded"] = data.get("max_expanded", core.DEPTH_FIRST_BUDGET)
+        stats = core.SearchStats()
+        path = core.solve(rules, start, goal, method, stats, **options)
+        result["solution"] = None if path is None else [list(rules.decode(state)) for state in path]
+        result["length"] = None if path is None else len(path) - 1
+        result["expanded"] = stats.expanded
+        result["seconds"] = round(stats.seconds, 6)
+    except Exception as error:
+        # Anything one puzzle raises, a missing NumPy included, stays in its
+        # own result
+        result["error"] = f"{type(error).__name__}: {error}"
+    return result
+
+
+def solve_chunk(chunk, method):
+    return [solve_line(line_number, line, method) for line_number, line in chunk]
+
+
+def read_chunks(lines, chunk_size):
+    numbered = ((number, line) for number, line in enumerate(lines, 1) if line.strip())
+    while True:
+        chunk = list(islice(numbered, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def write_results(results, output):
+    for result in results:
+        output.write(json.dumps(result) + "\n")
+    output.flush()
+
+
+def run_batch(lines, output, method="bfs", workers=None, chunk_size=32):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunks = read_chunks(lines, chunk_size)
+    solved = 0
+
+    if workers == 1:
+        for chunk in chunks:
+            results = solve_chunk(chunk, method)
+            write_results(results, output)
+            solved += len(results)
+        return solved
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        # Keep every worker busy with one chunk queued behind it, and no more
+        for chunk in islice(chunks, workers * 2):
+            pending.add(pool.submit(solve_chunk, chunk, method))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                results = future.result()
+                write_results(results, output)
+                solved += len(results)
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    pending.add(pool.submit(solve_chunk, chunk, method))
+    return solved
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a batch of river crossing puzzles.")
+    parser.add_argument("input", nargs="?", default="-",
+                        help="JSONL file of puzzle specs, or - for stdin (default)")
+    parser.add_argument("-o", "--output", default="-", help="where to write JSONL results (default stdout)")
+    parser.add_argument("-m", "--method", default="bfs", choices=sorted(core.SOLVERS),
+                        help="solver for specs that don't name one")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="worker processes (default: one per CPU, 1 solves in-process)")
+    parser.add_argument("-c", "--chunk-size", type=int, default=32, help="puzzles per task sent to a worker")
+    args = parser.parse_args(argv)
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        solved = run_batch(source, output, args.method, args.workers, max(1, args.chunk_size))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    print(f"Solved {solved} puzzles", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import os
+import sys
+
+from bench_solver import puzzle
+
+# Offscreen repaints of the PyQt5 canvas and redraws of the tkinter canvas.
+# Each case is (name, function to time). A frontend whose toolkit is
+# missing, or Tk without a display, is reported on stderr and skipped.
+
+
+def alternating_states(rules):
+    # Start state and the state after its first move, so each redraw moves
+    # the boat and at least one character
+    first = rules.decode(rules.start)
+    moves = rules.moves(rules.start)
+    return first, rules.decode(moves[0]) if moves else first
+
+
+def qt_cases(sizes):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PyQt5.QtGui import QImage
+        from PyQt5.QtWidgets import QApplication
+        import River_Crossing_PyQt5_GUI as gui
+    except ImportError as error:
+        print(f"Skipping PyQt5 renders: {error}", file=sys.stderr)
+        return
+    app = QApplication.instance() or QApplication([])
+
+    for size in sizes:
+        label, rules = puzzle(size)
+        canvas = gui.GameCanvas()
+        canvas.rules = rules
+        canvas.resize(860, 420)
+        states = alternating_states(rules)
+        canvas.set_game_state(states[0])
+        image = QImage(canvas.size(), QImage.Format_ARGB32_Premultiplied)
+        canvas.render(image)  # Builds the cached background and sprites
+
+        def paint(canvas=canvas, image=image):
+            canvas.render(image)
+
+        def step(canvas=canvas, states=states):
+            canvas.set_game_state(states[canvas.game_state == states[0]])
+
+        yield f"render.qt_paint/{label}", paint
+        yield f"render.qt_set_state/{label}", step
+    app.processEvents()
+
+
+def tk_cases(sizes):
+    try:
+        import tkinter as tk
+        import river_crossing_puzzle as gui
+    except ImportError as error:
+        print(f"Skipping tkinter renders: {error}", file=sys.stderr)
+        return
+    try:
+        root = tk.Tk()
+    except tk.TclError as error:
+        print(f"Skipping tkinter renders: {error}", file=sys.stderr)
+        return
+    root.withdraw()
+    game = gui.RiverCrossingGUI(root)
+
+    for size in sizes:
+        label, rules = puzzle(size)
+        game.rules = rules
+        states = alternating_states(rules)
+        game.current_state = states[0]
+        game.draw_scene()
+
+        def redraw(game=game, states=states):
+            game.current_state = states[game.current_state == states[0]]
+            game.draw_scene()
+            game.canvas.update_idletasks()
+
+        yield f"render.tk_draw_scene/{label}", redraw
+
+
+def cases(sizes):
+    yield from qt_cases(sizes)
+    yield from tk_cases(sizes)
@@ -0,0 +1,50 @@
+import random
+import sys
+
+import river_crossing_core as core
+
+# Solver and rule hot paths on the classic puzzle and on scaled instances.
+# Each case is (name, function to time). The plain BFS keeps a dict entry
+# per state, so the largest instances are only solved with the NumPy BFS.
+
+SAMPLE_STATES = 1000  # Random states per moves/is_valid case
+
+
+def puzzle(size):
+    if size == 4:
+        return "classic", core.CLASSIC
+    return f"n{size}", core.scaled_spec(size).compile()
+
+
+def cases(solve_sizes, numpy_sizes, rule_sizes):
+    for size in solve_sizes:
+        label, rules = puzzle(size)
+        yield f"solver.bfs/{label}", lambda rules=rules: core.bfs_solve(rules, rules.start, rules.goal)
+
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        print("Skipping NumPy solves: numpy is not installed", file=sys.stderr)
+        numpy_sizes = ()
+    for size in numpy_sizes:
+        label, rules = puzzle(size)
+        yield f"solver.numpy/{label}", lambda rules=rules: core.numpy_bfs_solve(rules, rules.start, rules.goal)
+
+    for size in rule_sizes:
+        label, rules = puzzle(size)
+        # Random states, valid or not, so every bank the memo can hold gets hit
+        generator = random.Random(size)
+        states = [generator.getrandbits(rules.size) for _ in range(SAMPLE_STATES)]
+
+        def generate_moves(rules=rules, states=states):
+            moves = rules.moves
+            for state in states:
+                moves(state)
+
+        def check_states(rules=rules, states=states):
+            is_valid = rules.is_valid
+            for state in states:
+                is_valid(state)
+
+        yield f"rules.moves/{label}", generate_moves
+        yield f"rules.is_valid/{label}", check_states
@@ -0,0 +1,142 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+# Benchmarks for the solver, the rule checks and the GUI repaints, on the
+# classic puzzle and on scaled instances. Results can be saved as a JSON
+# baseline and later runs compared against it:
+#
+#   python benchmarks/run.py --save benchmarks/baseline.json
+#   python benchmarks/run.py --compare benchmarks/baseline.json
+#
+# Timings depend on the machine, so compare against a baseline recorded on
+# the same one. Cases are compared on their fastest repeat, which is the one
+# least disturbed by whatever else the machine was doing.
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import bench_render  # noqa: E402
+import bench_solver  # noqa: E402
+
+SOLVE_SIZES = (4, 8, 12, 16, 20)
+NUMPY_SIZES = (16, 20, 24)
+RULE_SIZES = (4, 8, 12, 16, 20, 24, 28)
+RENDER_SIZES = (4, 8, 16, 24)
+QUICK_LIMIT = 16  # Largest instance --quick runs
+TARGET_SECONDS = 0.5  # Roughly how long each repeat of a case runs for
+NOISE_FLOOR_MS = 0.005  # Slack on top of the tolerance for sub-millisecond cases
+
+
+def measure(func, repeat):
+    # Warm up, calibrate the loop count off one call, then keep the per-call
+    # times of each repeat
+    func()
+    started = time.perf_counter()
+    func()
+    once = time.perf_counter() - started
+    number = max(1, int(TARGET_SECONDS / max(once, 1e-9)))
+
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - started) / number)
+    times.sort()
+    return {
+        "median_ms": round(times[len(times) // 2] * 1000, 6),
+        "min_ms": round(times[0] * 1000, 6),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def run(only, quick, repeat):
+    def fits(sizes):
+        return [size for size in sizes if not quick or size <= QUICK_LIMIT]
+
+    suites = [
+        bench_solver.cases(fits(SOLVE_SIZES), fits(NUMPY_SIZES), fits(RULE_SIZES)),
+        bench_render.cases(fits(RENDER_SIZES)),
+    ]
+    results = {}
+    for suite in suites:
+        for name, func in suite:
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            results[name] = measure(func, repeat)
+            print(f"{name:<32} {results[name]['min_ms']:12.4f} ms", file=sys.stderr)
+    return results
+
+
+def allowed_ms(before, now, tolerance):
+    # The slowest fastest-repeat that still passes: the tolerance, plus the
+    # spread between fastest and median repeat seen in either run, plus a
+    # floor so microsecond cases aren't judged on timer noise
+    spread = (before["median_ms"] - before["min_ms"]) + (now["median_ms"] - now["min_ms"])
+    return before["min_ms"] * (1 + tolerance) + max(spread, NOISE_FLOOR_MS)
+
+
+def compare(results, baseline, tolerance):
+    # Prints every case present in both runs; returns the names that got
+    # slower than allowed_ms
+    regressions = []
+    print(f"{'case':<32} {'baseline ms':>12} {'now ms':>12} {'ratio':>7}")
+    for name, result in results.items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:<32} {'-':>12} {result['min_ms']:12.4f} {'new':>7}")
+            continue
+        ratio = result["min_ms"] / max(before["min_ms"], 1e-9)
+        flag = ""
+        if result["min_ms"] > allowed_ms(before, result, tolerance):
+            regressions.append(name)
+            flag = "  SLOWER"
+        print(f"{name:<32} {before['min_ms']:12.4f} {result['min_ms']:12.4f} {ratio:7.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the river crossing solver and renderers.")
+    parser.add_argument("--only", action="append", metavar="PREFIX",
+                        help="run only cases whose name starts with PREFIX (repeatable), e.g. solver.bfs")
+    parser.add_argument("--quick", action="store_true", help=f"skip instances above {QUICK_LIMIT} entities")
+    parser.add_argument("--repeat", type=int, default=7, help="timed repeats per case (default 7)")
+    parser.add_argument("--save", metavar="FILE", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="slowdown of the fastest repeat that counts as a regression, on top of "
+                             "the noise seen in both runs (default 0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    results = run(args.only, args.quick, max(1, args.repeat))
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2, sort_keys=True)
+            handle.write("\n")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} case(s) slower than the baseline", file=sys.stderr)
+            return 1
+    elif not args.save:
+        print(json.dumps(report, indent=2, sort_keys=True))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
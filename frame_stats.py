@@ -0,0 +1,87 @@
+import csv
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Opt-in timing for the GUIs: how long paints, display updates and solves
+# take, and how late the event loop's timers fire. Nothing here imports a
+# GUI toolkit; each frontend feeds in samples and shows overlay_text() over
+# its canvas.
+#
+#   RIVER_CROSSING_FRAME_STATS=1 python River_Crossing_PyQt5_GUI.py
+#   RIVER_CROSSING_FRAME_STATS=1 RIVER_CROSSING_FRAME_CSV=frames.csv python river_crossing_puzzle.py
+#
+# With RIVER_CROSSING_FRAME_CSV set, every sample is written there when the
+# window closes.
+
+PROBE_INTERVAL = 0.016  # Seconds between timer jitter probes, about 60 Hz
+OVERLAY_INTERVAL = 0.5  # Seconds between overlay refreshes
+
+
+class FrameStats:
+    def __init__(self, window=240, csv_path=None):
+        self.window = window  # Samples per metric the percentiles cover
+        self.csv_path = csv_path
+        self.recent = {}  # Metric -> deque of the latest samples in ms
+        self.samples = []  # (seconds since start, metric, ms), only kept for a CSV
+        self.started = time.perf_counter()
+        self.last_tick = {}  # Metric -> when its timer last fired
+
+    def record(self, metric, ms):
+        if metric not in self.recent:
+            self.recent[metric] = deque(maxlen=self.window)
+        self.recent[metric].append(ms)
+        if self.csv_path is not None:
+            self.samples.append((time.perf_counter() - self.started, metric, ms))
+
+    @contextmanager
+    def measure(self, metric):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(metric, (time.perf_counter() - started) * 1000)
+
+    def tick(self, metric, interval):
+        # Called from a repeating timer; records how far each firing was
+        # from `interval` seconds after the previous one
+        now = time.perf_counter()
+        last = self.last_tick.get(metric)
+        if last is not None:
+            self.record(metric, abs(now - last - interval) * 1000)
+        self.last_tick[metric] = now
+
+    def percentile(self, metric, fraction):
+        values = sorted(self.recent.get(metric, ()))
+        if not values:
+            return None
+        return values[round(fraction * (len(values) - 1))]
+
+    def summary(self):
+        return {metric: (len(values), self.percentile(metric, 0.5), self.percentile(metric, 0.99))
+                for metric, values in self.recent.items()}
+
+    def overlay_text(self):
+        lines = []
+        for metric, (count, p50, p99) in sorted(self.summary().items()):
+            lines.append(f"{metric:<15} p50 {p50:7.2f} ms  p99 {p99:7.2f} ms  n={count}")
+        return "\n".join(lines) or "waiting for frames..."
+
+    def dump_csv(self, path=None):
+        # Samples are only kept when the FrameStats was given a csv_path
+        path = path or self.csv_path
+        if path is None:
+            return
+        with open(path, "w", newline="", encoding="utf-8") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(["seconds", "metric", "ms"])
+            for seconds, metric, ms in self.samples:
+                writer.writerow([f"{seconds:.6f}", metric, f"{ms:.4f}"])
+
+
+def from_environment():
+    # A FrameStats when RIVER_CROSSING_FRAME_STATS asks for one, else None
+    if os.environ.get("RIVER_CROSSING_FRAME_STATS", "") in ("", "0"):
+        return None
+    return FrameStats(csv_path=os.environ.get("RIVER_CROSSING_FRAME_CSV") or None)
@@ -0,0 +1,130 @@
+import argparse
+import json
+import sys
+
+import river_crossing_core as core
+
+# Solve one puzzle from the shell without starting a GUI. Only the core is
+# imported, so a call costs little more than the interpreter's own startup.
+#
+#   python river_crossing_cli.py                          # the classic puzzle
+#   python river_crossing_cli.py puzzle.json --start 0101 --format json
+#   python river_crossing_cli.py --scaled 18 --method numpy --stats
+#
+# A spec file holds the PuzzleSpec (or, with "counts", MultisetSpec) fields
+# as JSON, the same as one line of a batch_solve.py input; "-" reads it from
+# stdin. States are written one character per entity, 1 for the target
+# side, in the spec's entity order; a boat with several possible rowers, or
+# entities with counts, add a last character for the boat.
+
+
+def parse_state(text, rules):
+    # "0101" or a JSON list of sides, as batch_solve.py takes
+    if text.startswith("["):
+        sides = json.loads(text)
+    else:
+        sides = [char == "1" for char in text if char in "01"]
+    if len(sides) != rules.size:
+        raise ValueError(f"State needs {rules.size} sides, got {len(sides)}")
+    return rules.encode(sides)
+
+
+def load_rules(args):
+    if args.capacity is not None and args.capacity < 1:
+        raise ValueError("Boat capacity must be at least 1")
+    if args.scaled is not None:
+        return core.scaled_spec(args.scaled, 2 if args.capacity is None else args.capacity).compile()
+    if args.spec is None:
+        # Through the dict, so --capacity applies to the classic puzzle too
+        data = core.CLASSIC_SPEC.to_dict()
+    elif args.spec == "-":
+        data = json.load(sys.stdin)
+    else:
+        with open(args.spec, encoding="utf-8") as handle:
+            data = json.load(handle)
+    if args.capacity is not None:
+        data["capacity"] = args.capacity
+    return core.spec_from_dict(data).compile()
+
+
+def format_text(rules, path, stats):
+    lines = []
+    if path is None:
+        lines.append("No solution")
+    else:
+        crossings = len(path) - 1
+        lines.append(f"Solved in {crossings} crossing{'' if crossings == 1 else 's'}:")
+        for step, (state, new_state) in enumerate(zip(path, path[1:]), 1):
+            lines.append(f"  {step}. {rules.describe_move(rules.decode(state), rules.decode(new_state))}")
+    if stats is not None:
+        lines.append(f"{stats.expanded:,} expanded, {stats.generated:,} generated, "
+                     f"{stats.duplicates:,} duplicates, depth {stats.depth}, {stats.seconds * 1000:.2f} ms")
+        lines.append(f"peak frontier {stats.peak_frontier:,}, {stats.visited:,} states visited, "
+                     f"peak memory {stats.peak_memory / 1024:,.1f} KiB")
+    return "\n".join(lines)
+
+
+def format_json(rules, path, stats):
+    result = {"solution": None, "length": None, "moves": None}
+    if path is not None:
+        states = [rules.decode(state) for state in path]
+        result["solution"] = [list(state) for state in states]
+        result["length"] = len(path) - 1
+        result["moves"] = [rules.describe_move(state, new_state) for state, new_state in zip(states, states[1:])]
+    if stats is not None:
+        result["stats"] = stats.as_dict()
+    return json.dumps(result)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a river crossing puzzle from the command line.")
+    parser.add_argument("spec", nargs="?", default=None,
+                        help="JSON puzzle spec file, or - for stdin (default: the classic puzzle)")
+    parser.add_argument("--scaled", type=int, metavar="N",
+                        help="solve the classic puzzle padded with cargo to N entities instead")
+    parser.add_argument("--capacity", type=int, help="override the boat capacity")
+    parser.add_argument("--start", help="start state, e.g. 0000 (default: everyone on the left)")
+    parser.add_argument("--goal", help="goal state (default: everyone on the right)")
+    parser.add_argument("-m", "--method", default="bfs", choices=sorted(core.SOLVERS))
+    parser.add_argument("--table-size", type=int, default=core.DEPTH_FIRST_TABLE_SIZE, metavar="N",
+                        help="for iddfs and idastar, remember up to N states between paths "
+                             f"(default {core.DEPTH_FIRST_TABLE_SIZE}, 0 for none)")
+    parser.add_argument("--max-expanded", type=int, default=core.DEPTH_FIRST_BUDGET, metavar="N",
+                        help=f"for iddfs and idastar, give up after expanding N states (default {core.DEPTH_FIRST_BUDGET})")
+    parser.add_argument("-f", "--format", default="text", choices=("text", "json"))
+    parser.add_argument("--stats", action="store_true",
+                        help="report nodes expanded, duplicates, peak frontier and memory, and timings")
+    args = parser.parse_args(argv)
+
+    try:
+        rules = load_rules(args)
+        start = parse_state(args.start, rules) if args.start else rules.start
+        goal = parse_state(args.goal, rules) if args.goal else rules.goal
+        for name, state in (("start", start), ("goal", goal)):
+            if not rules.is_valid(state):
+                raise ValueError(f"The {name} state leaves someone unsafe")
+    except (OSError, ValueError, KeyError, TypeError) as error:
+        parser.error(str(error))
+
+    stats = core.SearchStats()
+    options = {}
+    if args.method in core.DEPTH_FIRST_SOLVERS:
+        options["table_size"] = args.table_size
+        options["max_expanded"] = args.max_expanded
+    try:
+        path = core.solve(rules, start, goal, args.method, stats, **options)
+    except (ValueError, ImportError) as error:
+        # A solver that can't take these rules, or whose NumPy is missing
+        parser.error(str(error))
+    except core.SearchLimitReached as error:
+        print(error, file=sys.stderr)
+        return 2
+    if args.format == "json":
+        print(format_json(rules, path, stats if args.stats else None))
+    else:
+        print(format_text(rules, path, stats if args.stats else None))
+    return 0 if path is not None else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1327 @@
+import sys
+import time
+import heapq
+from array import array
+from collections import OrderedDict, deque
+from itertools import combinations, product
+
+# Headless puzzle engine shared by the tkinter, PyQt5 and Kivy frontends.
+#
+# A state is an int bitmask: bit i set means entity i is on the target (right)
+# side. Crossing the river XORs the boat load into the state and the safety
+# rules become mask comparisons, so the solver never builds or hashes tuples.
+# The frontends keep their (farmer, lion, goat, grass) tuples for drawing and
+# convert at the edges with encode()/decode().
+#
+# Puzzles are described declaratively with a PuzzleSpec and compiled into
+# BitmaskRules, which is what move generation and the solvers work on.
+# Puzzles with interchangeable entities (missionaries and cannibals, a herd
+# of goats) use a MultisetSpec instead, which compiles into CountRules: the
+# same interface, with states that count each type rather than list
+# everyone.
+#
+# Nothing in here imports a GUI toolkit, so solver-only processes (the batch
+# solver, pool workers) start without paying for Tk, PyQt5 or Kivy.
+
+# Emoji the frontends draw for the classic cast; anyone else gets an initial
+EMOJI = {"Farmer": "👨‍🌾", "Lion": "🦁", "Goat": "🐐", "Grass": "🌾"}
+
+
+class BitmaskRules:
+    def __init__(self, names, loads, conflicts, guards, boat):
+        self.names = tuple(names)
+        # The boat gets its own bit after the entities when several can row
+        self.size = max(len(self.names), boat.bit_length())
+        self.full = (1 << self.size) - 1  # Everyone on the target side
+        self.state_count = 1 << self.size  # States are 0 .. state_count - 1
+        self.loads = tuple(loads)  # XOR masks, each one includes the boat bit
+        self.load_index = {load: i for i, load in enumerate(self.loads)}
+        self.conflicts = tuple(conflicts)  # Pairs that can't be left alone together
+        self.guards = guards  # Entities whose presence keeps a bank safe
+        self.boat = boat  # Bit that tells which side the boat is on
+        self.boat_index = boat.bit_length() - 1
+        self.entities = (1 << len(self.names)) - 1  # Entity bits, boat bit excluded
+        self.capacity = max(bin(load & self.entities).count("1") for load in self.loads)
+        self.start = 0
+        self.goal = self.full
+
+        # Whether a bank is safe only depends on the guards and the entities
+        # in some conflict, so banks are projected onto those bits before the
+        # memoised lookup
+        self.relevant = guards
+        for pair in self.conflicts:
+            self.relevant |= pair
+        self.safe_banks = _SafeBanks(guards, self.conflicts)
+
+    def fingerprint(self):
+        # Imported here so a one-shot solve from the CLI doesn't pay for it
+        import hashlib
+
+        # Same rules, same fingerprint, whatever order the loads were listed in
+        canonical = "|".join([
+            str(self.size),
+            ",".join(map(str, sorted(self.loads))),
+            ",".join(map(str, sorted(self.conflicts))),
+            str(self.guards),
+            str(self.boat),
+        ])
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def encode(self, state):
+        mask = 0
+        for i, side in enumerate(state):
+            if side:
+                mask |= 1 << i
+        return mask
+
+    def decode(self, mask):
+        return tuple(bool(mask >> i & 1) for i in range(self.size))
+
+    def is_valid(self, mask):
+        safe = self.safe_banks
+        relevant = self.relevant
+        return safe[(self.full ^ mask) & relevant] and safe[mask & relevant]
+
+    def moves(self, mask):
+        safe = self.safe_banks
+        relevant = self.relevant
+        # Everyone in the boat has to start on the boat's side
+        here = mask if mask & self.boat else self.full ^ mask
+        there = self.full ^ here
+        result = []
+        for load in self.loads:
+            if here & load == load and safe[(here ^ load) & relevant] and safe[(there | load) & relevant]:
+                result.append(mask ^ load)
+        return result
+
+    def apart(self, state, goal):
+        # Entities still to take over, and to bring back, on the way to goal
+        entities = self.entities
+        return bin(~state & goal & entities).count("1"), bin(state & ~goal & entities).count("1")
+
+    def boat_across(self, state):
+        return state & self.boat != 0
+
+    # The frontends hold states as tuples of sides; these take and give those
+
+    def state_is_valid(self, state):
+        return self.is_valid(self.encode(state))
+
+    def next_states(self, state):
+        return [self.decode(mask) for mask in self.moves(self.encode(state))]
+
+    def describe_move(self, state, new_state):
+        movers = [name for name, before, after in zip(self.names, state, new_state) if before != after]
+        if not movers:
+            return "Unknown move"
+        if self.boat_index < len(self.names):
+            # A lone rower is in every crossing
+            rower = self.names[self.boat_index]
+            cargo = [name for name in movers if name != rower]
+            return f"{rower} takes {_join_names(cargo)} across" if cargo else f"{rower} goes alone"
+        if len(movers) == 1:
+            return f"{movers[0]} goes alone"
+        return f"{_join_names(movers)} cross together"
+
+
+def _join_names(names):
+    if len(names) == 1:
+        return names[0]
+    return ", ".join(names[:-1]) + " and " + names[-1]
+
+
+class _SafeBanks(dict):
+    # Memo of bank mask -> safe, filled on first lookup
+
+    def __init__(self, guards, conflicts):
+        super().__init__()
+        self.guards = guards
+        self.conflicts = conflicts
+
+    def __missing__(self, bank):
+        safe = True
+        # Only a bank without a guard on it can go wrong
+        if not bank & self.guards:
+            for pair in self.conflicts:
+                if bank & pair == pair:
+                    safe = False
+                    break
+        self[bank] = safe
+        return safe
+
+
+class PuzzleSpec:
+    def __init__(self, entities, conflicts, rowers, capacity, guards=None):
+        self.entities = tuple(entities)
+        self.conflicts = tuple(tuple(pair) for pair in conflicts)  # (predator, prey)
+        self.rowers = tuple(rowers)
+        self.capacity = capacity  # Seats in the boat, rower included
+        # By default whoever can row is also who keeps the peace on a bank
+        self.guards = self.rowers if guards is None else tuple(guards)
+
+        if len(set(self.entities)) != len(self.entities):
+            raise ValueError("Entity names must be unique")
+        for name in [n for pair in self.conflicts for n in pair] + list(self.rowers + self.guards):
+            if name not in self.entities:
+                raise ValueError(f"Unknown entity: {name!r}")
+        if any(len(pair) != 2 for pair in self.conflicts):
+            raise ValueError("Conflicts must be (predator, prey) pairs")
+        if not self.rowers:
+            raise ValueError("At least one entity must be able to row")
+        if capacity < 1:
+            raise ValueError("Boat capacity must be at least 1")
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(entities=data["entities"],
+                   conflicts=data.get("conflicts", ()),
+                   rowers=data["rowers"],
+                   capacity=data.get("capacity", 2),
+                   guards=data.get("guards"))
+
+    def to_dict(self):
+        return {
+            "entities": list(self.entities),
+            "conflicts": [list(pair) for pair in self.conflicts],
+            "rowers": list(self.rowers),
+            "capacity": self.capacity,
+            "guards": list(self.guards),
+        }
+
+    def compile(self):
+        bit = {name: 1 << i for i, name in enumerate(self.entities)}
+        rower_mask = 0
+        for name in self.rowers:
+            rower_mask |= bit[name]
+        guard_mask = 0
+        for name in self.guards:
+            guard_mask |= bit[name]
+
+        # A lone rower is always in the boat, so its bit doubles as the boat's
+        if len(self.rowers) == 1:
+            boat = rower_mask
+        else:
+            boat = 1 << len(self.entities)
+
+        # Every group of up to `capacity` entities with someone to row it,
+        # fullest boats first
+        loads = []
+        for seats in range(min(self.capacity, len(self.entities)), 0, -1):
+            for group in combinations(self.entities, seats):
+                load = 0
+                for name in group:
+                    load |= bit[name]
+                if load & rower_mask:
+                    loads.append(load | boat)
+
+        conflicts = [bit[predator] | bit[prey] for predator, prey in self.conflicts]
+        return BitmaskRules(self.entities, loads, conflicts, guard_mask, boat)
+
+
+CLASSIC_SPEC = PuzzleSpec(
+    entities=("Farmer", "Lion", "Goat", "Grass"),
+    conflicts=(("Lion", "Goat"), ("Goat", "Grass")),
+    rowers=("Farmer",),
+    capacity=2,
+)
+CLASSIC = CLASSIC_SPEC.compile()
+
+
+class CountRules:
+    # Rules for puzzles whose entities come in interchangeable types. A state
+    # holds how many of each type are on the target side, as the digits of a
+    # mixed-radix int, and the boat's side as the top digit. Swapping two
+    # goats gives the same state, so the space grows as the product of
+    # (count + 1) over the types instead of 2 to the number of entities.
+    #
+    # For the frontends every entity still gets a slot in the decoded tuple,
+    # with the boat in a last slot of its own; of each type, the first ones
+    # are the ones on the target side.
+    def __init__(self, types, counts, loads, conflicts, outnumbered, guards):
+        self.types = tuple(types)
+        self.counts = tuple(counts)
+        self.slot_types = tuple(t for t, count in enumerate(self.counts) for _ in range(count))
+        self.names = tuple(
+            name if count == 1 else f"{name} {i}"
+            for name, count in zip(self.types, self.counts) for i in range(1, count + 1)
+        )
+        self.size = len(self.names) + 1
+        self.boat_index = len(self.names)
+
+        self.strides = []  # Value of one of each type on the target side
+        stride = 1
+        for count in self.counts:
+            self.strides.append(stride)
+            stride *= count + 1
+        self.strides = tuple(self.strides)
+        self.boat = stride  # Value of the boat digit
+        self.state_count = 2 * stride  # States are 0 .. state_count - 1
+        self.full = self.state_count - 1  # Every digit at its largest
+        self.start = 0
+        self.goal = self.full
+
+        self.loads = tuple(loads)  # How many of each type are in the boat
+        # Crossing to the target side adds a load's delta, coming back takes it away
+        self.deltas = tuple(sum(n * s for n, s in zip(load, self.strides)) + self.boat for load in self.loads)
+        self.conflicts = tuple(conflicts)  # (predator, prey) type indexes
+        self.outnumbered = tuple(outnumbered)  # (many, few) type indexes
+        self.guards = tuple(guards)  # Types whose presence keeps a bank safe from conflicts
+        self.capacity = max(sum(load) for load in self.loads)
+        self.safe_sides = _SafeCounts(self)
+
+    def fingerprint(self):
+        import hashlib
+
+        canonical = "|".join([
+            "counts",
+            ",".join(map(str, self.counts)),
+            ";".join(sorted(",".join(map(str, load)) for load in self.loads)),
+            ",".join(map(str, sorted(self.conflicts))),
+            ",".join(map(str, sorted(self.outnumbered))),
+            ",".join(map(str, sorted(self.guards))),
+        ])
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def tally(self, state):
+        # How many of each type are on the target side
+        return [state // stride % (count + 1) for stride, count in zip(self.strides, self.counts)]
+
+    def encode(self, state):
+        value = self.boat if state[self.boat_index] else 0
+        strides = self.strides
+        for t, side in zip(self.slot_types, state):
+            if side:
+                value += strides[t]
+        return value
+
+    def decode(self, value):
+        sides = []
+        for across, count in zip(self.tally(value), self.counts):
+            sides.extend([True] * across + [False] * (count - across))
+        sides.append(value >= self.boat)
+        return tuple(sides)
+
+    def is_valid(self, value):
+        return self.safe_sides[value % self.boat]
+
+    def moves(self, value):
+        safe = self.safe_sides
+        boat = self.boat
+        across = self.tally(value)
+        if value >= boat:
+            here = across
+            sign = -1
+        else:
+            here = [count - n for count, n in zip(self.counts, across)]
+            sign = 1
+        result = []
+        for load, delta in zip(self.loads, self.deltas):
+            for n, available in zip(load, here):
+                if n > available:
+                    break
+            else:
+                new_value = value + sign * delta
+                if safe[new_value % boat]:
+                    result.append(new_value)
+        return result
+
+    def apart(self, value, goal):
+        to_right = to_left = 0
+        for now, wanted in zip(self.tally(value), self.tally(goal)):
+            if now < wanted:
+                to_right += wanted - now
+            else:
+                to_left += now - wanted
+        return to_right, to_left
+
+    def boat_across(self, value):
+        return value >= self.boat
+
+    def state_is_valid(self, state):
+        return self.is_valid(self.encode(state))
+
+    def next_states(self, state):
+        return [self.decode(value) for value in self.moves(self.encode(state))]
+
+    def describe_move(self, state, new_state):
+        before = self.tally(self.encode(state))
+        after = self.tally(self.encode(new_state))
+        movers = [(name, abs(b - a)) for name, b, a in zip(self.types, before, after) if b != a]
+        if not movers:
+            return "Unknown move"
+        parts = [name if n == 1 else f"{n} {_plural(name)}" for name, n in movers]
+        if len(movers) == 1 and movers[0][1] == 1:
+            return f"{parts[0]} goes alone"
+        return f"{_join_names(parts)} cross together"
+
+
+def _plural(name):
+    if name.endswith(("s", "x", "ch", "sh")):
+        return name + "es"
+    if name.endswith("y") and name[-2:-1] not in "aeiou":
+        return name[:-1] + "ies"
+    return name + "s"
+
+
+class _SafeCounts(dict):
+    # Memo of target-side digits -> both banks safe, filled on first lookup
+
+    def __init__(self, rules):
+        super().__init__()
+        self.rules = rules
+
+    def __missing__(self, value):
+        rules = self.rules
+        across = rules.tally(value)
+        safe = (self.bank_is_safe(across)
+                and self.bank_is_safe([count - n for count, n in zip(rules.counts, across)]))
+        self[value] = safe
+        return safe
+
+    def bank_is_safe(self, bank):
+        rules = self.rules
+        for many, few in rules.outnumbered:
+            if 0 < bank[few] < bank[many]:
+                return False
+        # Only a bank without a guard on it can have a conflict
+        if not any(bank[t] for t in rules.guards):
+            for predator, prey in rules.conflicts:
+                if bank[predator] and bank[prey]:
+                    return False
+        return True
+
+
+class MultisetSpec:
+    # Like PuzzleSpec, but each entity is a type with a count. Conflicts and
+    # guards work per type; an outnumbered (many, few) pair makes a bank
+    # unsafe when some of `few` are on it and more of `many`, whoever else
+    # is there.
+    def __init__(self, entities, counts, conflicts, rowers, capacity, outnumbered=(), guards=None):
+        self.entities = tuple(entities)
+        self.counts = tuple(counts)
+        self.conflicts = tuple(tuple(pair) for pair in conflicts)  # (predator, prey)
+        self.outnumbered = tuple(tuple(pair) for pair in outnumbered)  # (many, few)
+        self.rowers = tuple(rowers)
+        self.capacity = capacity  # Seats in the boat, rower included
+        self.guards = self.rowers if guards is None else tuple(guards)
+
+        if len(set(self.entities)) != len(self.entities):
+            raise ValueError("Entity names must be unique")
+        if len(self.counts) != len(self.entities) or any(count < 1 for count in self.counts):
+            raise ValueError("Every entity needs a count of at least 1")
+        pairs = self.conflicts + self.outnumbered
+        for name in [n for pair in pairs for n in pair] + list(self.rowers + self.guards):
+            if name not in self.entities:
+                raise ValueError(f"Unknown entity: {name!r}")
+        if any(len(pair) != 2 for pair in pairs):
+            raise ValueError("Conflicts and outnumbered rules must be pairs")
+        if not self.rowers:
+            raise ValueError("At least one entity must be able to row")
+        if capacity < 1:
+            raise ValueError("Boat capacity must be at least 1")
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(entities=data["entities"],
+                   counts=data["counts"],
+                   conflicts=data.get("conflicts", ()),
+                   rowers=data["rowers"],
+                   capacity=data.get("capacity", 2),
+                   outnumbered=data.get("outnumbered", ()),
+                   guards=data.get("guards"))
+
+    def to_dict(self):
+        return {
+            "entities": list(self.entities),
+            "counts": list(self.counts),
+            "conflicts": [list(pair) for pair in self.conflicts],
+            "outnumbered": [list(pair) for pair in self.outnumbered],
+            "rowers": list(self.rowers),
+            "capacity": self.capacity,
+            "guards": list(self.guards),
+        }
+
+    def compile(self):
+        index = {name: t for t, name in enumerate(self.entities)}
+        rowers = [index[name] for name in self.rowers]
+
+        # Every mix of up to `capacity` entities with someone to row it,
+        # fullest boats first
+        loads = []
+        for load in product(*(range(count + 1) for count in self.counts)):
+            if 0 < sum(load) <= self.capacity and any(load[t] for t in rowers):
+                loads.append(load)
+        loads.sort(key=sum, reverse=True)
+
+        return CountRules(
+            self.entities, self.counts, loads,
+            [(index[predator], index[prey]) for predator, prey in self.conflicts],
+            [(index[many], index[few]) for many, few in self.outnumbered],
+            [index[name] for name in self.guards],
+        )
+
+
+def spec_from_dict(data):
+    # Puzzle files give counts only when some entities are interchangeable
+    if "counts" in data:
+        return MultisetSpec.from_dict(data)
+    return PuzzleSpec.from_dict(data)
+
+
+def missionaries_spec(pairs=3, capacity=2):
+    # Missionaries and cannibals: never leave missionaries outnumbered
+    return MultisetSpec(
+        entities=("Missionary", "Cannibal"),
+        counts=(pairs, pairs),
+        conflicts=(),
+        rowers=("Missionary", "Cannibal"),
+        capacity=capacity,
+        outnumbered=(("Cannibal", "Missionary"),),
+    )
+
+
+def scaled_spec(size, capacity=2):
+    # The classic puzzle plus harmless cargo, for exercising the solvers on
+    # state spaces that grow as 2^size
+    if size < 4:
+        raise ValueError("A scaled puzzle needs at least the four classic entities")
+    cargo = [f"Crate {i}" for i in range(1, size - 3)]
+    return PuzzleSpec(
+        entities=CLASSIC_SPEC.entities + tuple(cargo),
+        conflicts=CLASSIC_SPEC.conflicts,
+        rowers=CLASSIC_SPEC.rowers,
+        capacity=capacity,
+    )
+
+
+class SearchCancelled(Exception):
+    # Raised from a progress hook to stop a search; it propagates out of
+    # the solver and nothing is cached
+    pass
+
+
+class SearchLimitReached(SearchCancelled):
+    # Raised by a solver that used up its max_expanded budget
+    pass
+
+
+# Bytes of one stored state: every state is its own int object
+STATE_BYTES = sys.getsizeof(1 << 29)
+
+
+class SearchStats:
+    # Filled in by the solvers so different methods can be compared and big
+    # instances sized up front.
+    # on_layer(stats) is called each time a search starts a new layer, which
+    # is where GUIs report progress and where a search can be cancelled.
+    # on_expand(stats, state, moves) is called for every expanded state (the
+    # NumPy solver expands a layer at a time and passes arrays of both); it
+    # is for tracing, and slows any search down.
+    def __init__(self, on_layer=None, on_expand=None):
+        self.expanded = 0  # States whose moves were generated
+        self.generated = 0  # Moves produced, duplicates included
+        self.duplicates = 0  # Moves dropped because their state was already seen
+        self.depth = 0  # Layer being expanded (f bound for A*)
+        self.frontier = 0  # States waiting to be expanded
+        self.peak_frontier = 0
+        self.visited = 0  # States stored so far
+        self.peak_memory = 0  # Largest size of the visited states and parent links, in bytes
+        self.layer_seconds = []  # Time spent in each layer, in order
+        self.seconds = 0.0
+        self.on_layer = on_layer
+        self.on_expand = on_expand
+        self.tracked = ()
+        self.layer_started = None
+
+    def track(self, states, *links):
+        # The containers a solver keeps its visited states and parent links
+        # in; measured when the search ends, and at each layer only for an
+        # on_layer hook. They only grow during a search, so the end is the
+        # peak; a solver that empties one measures before it does.
+        self.tracked = (states,) + links
+
+    def measure_memory(self):
+        if not self.tracked:
+            return
+        states = self.tracked[0]
+        size = sum(sys.getsizeof(container) for container in self.tracked)
+        if isinstance(states, (dict, set)):
+            self.visited = len(states)
+            size += len(states) * STATE_BYTES
+        # Bitmaps and arrays sized to the state space hold no int objects,
+        # and the solvers using them count visited states themselves
+        self.peak_memory = max(self.peak_memory, size)
+
+    def layer(self, depth, frontier):
+        now = time.perf_counter()
+        if self.layer_started is not None:
+            self.layer_seconds.append(now - self.layer_started)
+        self.layer_started = now
+        self.depth = depth
+        self.frontier = frontier
+        if frontier > self.peak_frontier:
+            self.peak_frontier = frontier
+        if self.on_layer is not None:
+            self.measure_memory()
+            self.on_layer(self)
+
+    def finish(self, began):
+        now = time.perf_counter()
+        if self.layer_started is not None:
+            self.layer_seconds.append(now - self.layer_started)
+            self.layer_started = None
+        self.measure_memory()
+        self.seconds = now - began
+
+    def as_dict(self):
+        return {
+            "expanded": self.expanded,
+            "generated": self.generated,
+            "duplicates": self.duplicates,
+            "depth": self.depth,
+            "peak_frontier": self.peak_frontier,
+            "visited": self.visited,
+            "peak_memory": self.peak_memory,
+            "layer_seconds": [round(seconds, 6) for seconds in self.layer_seconds],
+            "seconds": round(self.seconds, 6),
+        }
+
+
+def rebuild_path(parents, state):
+    path = []
+    while state is not None:
+        path.append(state)
+        state = parents[state]
+    path.reverse()
+    return path
+
+
+# State spaces BFS may move to a bitmap. Below 2^16 states the dict is small
+# and a little faster; 2^28 states take a 32 MiB bitmap plus one or two bytes
+# of parent per state, and anything bigger is left to the dict.
+COMPACT_MIN_BITS = 16
+COMPACT_MAX_BITS = 28
+# With store="auto" the search starts on a dict and moves to the bitmap once
+# it holds this fraction of the space: a dict entry and its int take ~100
+# bytes, so past 1/64 of the states the bitmap and parent array are smaller
+COMPACT_DENSITY = 64
+
+
+def bfs_solve(rules, start, goal, stats=None, store="auto"):
+    # store picks how visited states are kept: "bitmap" (a bit per state in
+    # the whole space), "dict" (an entry per state reached) or "auto", which
+    # starts with the dict and moves to the bitmap only once enough of the
+    # space has been reached, so sparse searches never allocate it
+    if stats is None:
+        stats = SearchStats()
+    # The bitmap walks back by XORing loads, so it needs BitmaskRules
+    bitmask = isinstance(rules, BitmaskRules)
+    if store not in ("auto", "bitmap", "dict"):
+        raise ValueError(f"Unknown store {store!r}, expected 'auto', 'bitmap' or 'dict'")
+    if store == "bitmap" and not bitmask:
+        raise ValueError("The bitmap store only works with BitmaskRules")
+    switch_at = None
+    if store == "auto" and bitmask and 1 << COMPACT_MIN_BITS <= rules.state_count <= 1 << COMPACT_MAX_BITS:
+        switch_at = rules.state_count // COMPACT_DENSITY
+    began = time.perf_counter()
+    try:
+        if store == "bitmap":
+            return _bitmap_bfs(rules, start, goal, stats)
+        return _bfs(rules, start, goal, stats, switch_at)
+    finally:
+        stats.finish(began)
+
+
+def _bfs(rules, start, goal, stats, switch_at=None):
+    # One parent link per discovered state, and states count as visited as
+    # soon as they are queued, so nothing is ever in the frontier twice.
+    # Past switch_at states the rest of the search goes to _bitmap_bfs.
+    parents = {start: None}
+    stats.track(parents)
+    if start == goal:
+        return [start]
+
+    expand = stats.on_expand
+    frontier = deque([start])
+    depth = 0
+    while frontier:
+        if switch_at is not None and len(parents) > switch_at:
+            stats.measure_memory()
+            return _bitmap_bfs(rules, start, goal, stats, parents, frontier, depth)
+        stats.layer(depth, len(frontier))
+        for _ in range(len(frontier)):
+            state = frontier.popleft()
+            moves = rules.moves(state)
+            stats.expanded += 1
+            stats.generated += len(moves)
+            if expand is not None:
+                expand(stats, state, moves)
+            for move in moves:
+                if move in parents:
+                    stats.duplicates += 1
+                    continue
+                parents[move] = state
+                if move == goal:
+                    return rebuild_path(parents, move)
+                frontier.append(move)
+        depth += 1
+    return None
+
+
+def _index_typecode(count):
+    # Smallest unsigned array type that holds indexes below count
+    for typecode in ("B", "H", "I", "L"):
+        if count <= 1 << (8 * array(typecode).itemsize):
+            return typecode
+    return "Q"
+
+
+def _bitmap_bfs(rules, start, goal, stats, parents=None, layer=(), depth=0):
+    # Same search as _bfs, but visited is one bit per state and the parent
+    # link is the index of the load that reached a state, packed in an array
+    # sized to the state space: a 24-entity puzzle takes 2 MiB + 16 MiB
+    # rather than a dict entry and an int (~100 bytes) for each of its 16M
+    # states. XORing that load back into a state gives its parent.
+    # parents, layer and depth take over a search _bfs has started.
+    count = rules.state_count
+    visited = bytearray((count + 7) >> 3)
+    parent_load = array(_index_typecode(len(rules.loads)), [0]) * count
+    if start == goal:
+        stats.track(visited, parent_load)
+        return [start]
+
+    load_index = rules.load_index
+    expand = stats.on_expand
+    if parents is None:
+        parents = {start: None}
+        layer = [start]
+    for state, parent in parents.items():
+        visited[state >> 3] |= 1 << (state & 7)
+        if parent is not None:
+            parent_load[state] = load_index[state ^ parent]
+    stats.visited = len(parents)
+    stats.track(visited, parent_load)
+    # Emptied rather than dropped, as _bfs still holds them
+    taken = layer
+    layer = array("Q", taken)
+    parents.clear()
+    taken.clear()
+    while layer:
+        stats.layer(depth, len(layer))
+        depth += 1
+        next_layer = array("Q")
+        for state in layer:
+            moves = rules.moves(state)
+            stats.expanded += 1
+            stats.generated += len(moves)
+            if expand is not None:
+                expand(stats, state, moves)
+            for move in moves:
+                bit = 1 << (move & 7)
+                if visited[move >> 3] & bit:
+                    stats.duplicates += 1
+                    continue
+                visited[move >> 3] |= bit
+                parent_load[move] = load_index[move ^ state]
+                if move == goal:
+                    stats.visited += len(next_layer) + 1
+                    path = [goal]
+                    while move != start:
+                        move ^= rules.loads[parent_load[move]]
+                        path.append(move)
+                    path.reverse()
+                    return path
+                next_layer.append(move)
+        stats.visited += len(next_layer)
+        layer = next_layer
+    return None
+
+
+def bidirectional_bfs_solve(rules, start, goal, stats=None):
+    if stats is None:
+        stats = SearchStats()
+    began = time.perf_counter()
+    try:
+        return _bidirectional_bfs(rules, start, goal, stats)
+    finally:
+        stats.finish(began)
+
+
+def _bidirectional_bfs(rules, start, goal, stats):
+    # Every move can be undone by making it again, so the goal side can be
+    # searched with the same move generator as the start side
+    if start == goal:
+        return [start]
+    forward = {start: None}
+    backward = {goal: None}
+    stats.track(forward, backward)
+    expand = stats.on_expand
+    forward_layer = [start]
+    backward_layer = [goal]
+    depth = 0
+
+    while forward_layer and backward_layer:
+        stats.layer(depth, len(forward_layer) + len(backward_layer))
+        depth += 1
+        # Grow whichever side has the smaller frontier by one whole layer.
+        # Until now no state was reached from both ends, so the first state
+        # that is closes a shortest path
+        if len(forward_layer) <= len(backward_layer):
+            parents, others, layer = forward, backward, forward_layer
+        else:
+            parents, others, layer = backward, forward, backward_layer
+
+        next_layer = []
+        for state in layer:
+            moves = rules.moves(state)
+            stats.expanded += 1
+            stats.generated += len(moves)
+            if expand is not None:
+                expand(stats, state, moves)
+            for move in moves:
+                if move in parents:
+                    stats.duplicates += 1
+                    continue
+                parents[move] = state
+                if move in others:
+                    path = rebuild_path(forward, move)
+                    state = backward[move]
+                    while state is not None:
+                        path.append(state)
+                        state = backward[state]
+                    return path
+                next_layer.append(move)
+
+        if parents is forward:
+            forward_layer = next_layer
+        else:
+            backward_layer = next_layer
+    return None
+
+
+class DistanceTable:
+    # One BFS outwards from the goal labels every state that can still reach
+    # it with its distance and the next state on a shortest way there. Moves
+    # undo themselves, so searching from the goal uses the same generator.
+    # After that, solvability, the best next move and a full solution from
+    # any state are lookups instead of searches.
+    def __init__(self, rules, goal=None, stats=None):
+        if stats is None:
+            stats = SearchStats()
+        began = time.perf_counter()
+        self.rules = rules
+        self.goal = rules.goal if goal is None else goal
+        self.distances = {self.goal: 0}
+        self.next_states = {self.goal: None}
+        stats.track(self.distances, self.next_states)
+        expand = stats.on_expand
+
+        layer = [self.goal]
+        depth = 0
+        while layer:
+            stats.layer(depth, len(layer))
+            depth += 1
+            next_layer = []
+            for state in layer:
+                moves = rules.moves(state)
+                stats.expanded += 1
+                stats.generated += len(moves)
+                if expand is not None:
+                    expand(stats, state, moves)
+                for move in moves:
+                    if move in self.distances:
+                        stats.duplicates += 1
+                        continue
+                    self.distances[move] = depth
+                    self.next_states[move] = state
+                    next_layer.append(move)
+            layer = next_layer
+        stats.finish(began)
+
+    def __len__(self):
+        return len(self.distances)
+
+    def is_solvable(self, state):
+        return state in self.distances
+
+    def distance(self, state):
+        return self.distances.get(state)
+
+    def best_move(self, state):
+        # None at the goal and from states that can't reach it
+        return self.next_states.get(state)
+
+    def path_from(self, state):
+        if state not in self.distances:
+            return None
+        path = [state]
+        while state != self.goal:
+            state = self.next_states[state]
+            path.append(state)
+        return path
+
+
+def _shortest_path_layers(rules, start, goal):
+    # BFS from the start that stops once the goal's layer is complete. Along
+    # the way each state gets the number of shortest paths reaching it: the
+    # sum over the states one layer up that lead to it.
+    distances = {start: 0}
+    ways = {start: 1}
+    layer = [start]
+    while layer and goal not in distances:
+        next_layer = []
+        for state in layer:
+            depth = distances[state] + 1
+            for move in rules.moves(state):
+                if move not in distances:
+                    distances[move] = depth
+                    ways[move] = 0
+                    next_layer.append(move)
+                if distances[move] == depth:
+                    ways[move] += ways[state]
+        layer = next_layer
+    return distances, ways
+
+
+def count_shortest_solutions(rules, start, goal):
+    # Counted over the layered BFS graph, never by listing paths, so this is
+    # cheap even when the answer has hundreds of digits
+    _, ways = _shortest_path_layers(rules, start, goal)
+    return ways.get(goal, 0)
+
+
+def iter_shortest_solutions(rules, start, goal):
+    # Yields every shortest solution, one at a time. Walking back from the
+    # goal only through states one layer closer to the start can never hit
+    # a dead end, and only the current path and its move iterators are kept.
+    distances, _ = _shortest_path_layers(rules, start, goal)
+    if goal not in distances:
+        return
+    if start == goal:
+        yield [start]
+        return
+
+    path = [goal]
+    pending = [iter(rules.moves(goal))]
+    while pending:
+        previous = next(pending[-1], None)
+        if previous is None:
+            pending.pop()
+            path.pop()
+        elif distances.get(previous) == distances[path[-1]] - 1:
+            if previous == start:
+                yield [start] + path[::-1]
+            else:
+                path.append(previous)
+                pending.append(iter(rules.moves(previous)))
+
+
+# A* heuristics, by name. A heuristic takes (rules, state, goal) and must
+# never overestimate the number of crossings left, or A* stops being optimal
+HEURISTICS = {}
+
+
+def register_heuristic(name):
+    def register(heuristic):
+        HEURISTICS[name] = heuristic
+        return heuristic
+    return register
+
+
+@register_heuristic("zero")
+def zero_heuristic(rules, state, goal):
+    return 0
+
+
+@register_heuristic("crossings")
+def crossings_heuristic(rules, state, goal):
+    capacity = rules.capacity
+    to_right, to_left = rules.apart(state, goal)
+    if goal != rules.goal:
+        # Each crossing moves at most `capacity` entities one way
+        return -(-to_right // capacity) - (-to_left // capacity)
+
+    left = to_right
+    if rules.boat_across(state):
+        if not left:
+            return 0
+        # Someone has to row back first, adding at least one to the left bank
+        return 1 + _crossings_from_left(left + 1, capacity)
+    return _crossings_from_left(left, capacity)
+
+
+def _crossings_from_left(left, capacity):
+    if left <= capacity:
+        return 1
+    if capacity == 1:
+        return 2 * left - 1
+    # f trips over and f - 1 back, and every trip back returns a rower:
+    # f * capacity - (f - 1) >= left
+    trips = -(-(left - 1) // (capacity - 1))
+    return 2 * trips - 1
+
+
+def astar_solve(rules, start, goal, stats=None, heuristic="crossings"):
+    if stats is None:
+        stats = SearchStats()
+    if not callable(heuristic):
+        if heuristic not in HEURISTICS:
+            raise ValueError(f"Unknown heuristic {heuristic!r}, expected one of {sorted(HEURISTICS)}")
+        heuristic = HEURISTICS[heuristic]
+    began = time.perf_counter()
+    try:
+        return _astar(rules, start, goal, stats, heuristic)
+    finally:
+        stats.finish(began)
+
+
+def _astar(rules, start, goal, stats, heuristic):
+    parents = {start: None}
+    cost = {start: 0}
+    stats.track(cost, parents)
+    expand = stats.on_expand
+    # (f, -g, order, state): ties go to the deepest state, then first come
+    order = 0
+    heap = [(heuristic(rules, start, goal), 0, order, start)]
+    bound = -1
+
+    while heap:
+        f, neg_g, _, state = heapq.heappop(heap)
+        g = -neg_g
+        if g > cost[state]:
+            continue  # Stale entry, a cheaper way here was found since
+        if f > bound:
+            bound = f
+            stats.layer(bound, len(heap) + 1)
+        if state == goal:
+            return rebuild_path(parents, state)
+
+        moves = rules.moves(state)
+        stats.expanded += 1
+        stats.generated += len(moves)
+        if expand is not None:
+            expand(stats, state, moves)
+        for move in moves:
+            if move in cost and cost[move] <= g + 1:
+                stats.duplicates += 1
+                continue
+            cost[move] = g + 1
+            parents[move] = state
+            order += 1
+            heapq.heappush(heap, (g + 1 + heuristic(rules, move, goal), -(g + 1), order, move))
+        if len(heap) > stats.peak_frontier:
+            stats.peak_frontier = len(heap)
+    return None
+
+
+# Solvers that keep only the current path, and the transposition table they
+# get unless told otherwise: about 7 MiB at 2^16 states
+DEPTH_FIRST_SOLVERS = ("iddfs", "idastar")
+DEPTH_FIRST_TABLE_SIZE = 1 << 16
+# max_expanded the CLI and batch solver give them, so no puzzle runs forever
+DEPTH_FIRST_BUDGET = 10_000_000
+
+
+def iddfs_solve(rules, start, goal, stats=None, table_size=DEPTH_FIRST_TABLE_SIZE, max_expanded=None):
+    # Depth-first search with a depth limit that goes up by one until the
+    # goal turns up, so only the current path is kept: memory grows with the
+    # solution length, not the state space. See _depth_first for table_size
+    # and max_expanded.
+    if stats is None:
+        stats = SearchStats()
+    began = time.perf_counter()
+    try:
+        return _depth_first(rules, start, goal, stats, zero_heuristic, table_size, max_expanded)
+    finally:
+        stats.finish(began)
+
+
+def idastar_solve(rules, start, goal, stats=None, heuristic="crossings",
+                  table_size=DEPTH_FIRST_TABLE_SIZE, max_expanded=None):
+    # IDA*: the same bounded-memory search, limited on moves made plus the
+    # heuristic's estimate of the moves left instead of on depth alone
+    if stats is None:
+        stats = SearchStats()
+    if not callable(heuristic):
+        if heuristic not in HEURISTICS:
+            raise ValueError(f"Unknown heuristic {heuristic!r}, expected one of {sorted(HEURISTICS)}")
+        heuristic = HEURISTICS[heuristic]
+    began = time.perf_counter()
+    try:
+        return _depth_first(rules, start, goal, stats, heuristic, table_size, max_expanded)
+    finally:
+        stats.finish(began)
+
+
+def _depth_first(rules, start, goal, stats, heuristic, table_size, max_expanded):
+    # Each iteration is a depth-first search that skips states already on
+    # the path and cuts off where moves made plus the heuristic exceed the
+    # bound; the next bound is the smallest value that was cut off. With a
+    # zero heuristic that is plain iterative deepening.
+    #
+    # With table_size > 0 a transposition table remembers the fewest moves
+    # each state was reached in during the current iteration, and a state
+    # reached again in no fewer is skipped. It holds at most table_size
+    # states, dropping the least recently used, so memory stays capped and
+    # an evicted state just gets searched again.
+    #
+    # There is no solution once an iteration cuts nothing off, or once the
+    # table kept every state it reached and also holds every state that was
+    # cut off: then every move from a state in the table leads back into
+    # it, so the table is everything reachable. Without a table, or when it
+    # overflows, proving that can take trying every path, so max_expanded
+    # caps the states expanded and raises SearchLimitReached past it.
+    if start == goal:
+        return [start]
+
+    path = [start]
+    on_path = {start}
+    table = OrderedDict()
+    cut = set()  # States cut off this iteration that weren't in the table yet
+    if table_size > 0:
+        stats.track(table, path, on_path, cut)
+    else:
+        stats.track(on_path, path)
+    expand = stats.on_expand
+
+    bound = heuristic(rules, start, goal)
+    while True:
+        stats.layer(bound, 1)
+        table.clear()
+        cut.clear()
+        if table_size > 0:
+            table[start] = 0
+        complete = table_size > 0  # Nothing evicted and every cut-off remembered
+        next_bound = None
+        moves = rules.moves(start)
+        stats.expanded += 1
+        stats.generated += len(moves)
+        if expand is not None:
+            expand(stats, start, moves)
+        pending = [iter(moves)]
+        while pending:
+            state = next(pending[-1], None)
+            if state is None:
+                pending.pop()
+                on_path.discard(path.pop())
+                continue
+            if state in on_path:
+                stats.duplicates += 1
+                continue
+            g = len(path)
+            f = g + heuristic(rules, state, goal)
+            if f > bound:
+                if next_bound is None or f < next_bound:
+                    next_bound = f
+                if complete and state not in table:
+                    if len(cut) < table_size:
+                        cut.add(state)
+                    else:
+                        complete = False
+                continue
+            if state == goal:
+                path.append(state)
+                return path
+            if table_size > 0:
+                seen = table.get(state)
+                if seen is not None and seen <= g:
+                    table.move_to_end(state)
+                    stats.duplicates += 1
+                    continue
+                table[state] = g
+                table.move_to_end(state)
+                if len(table) > table_size:
+                    table.popitem(last=False)
+                    complete = False
+
+            if max_expanded is not None and stats.expanded >= max_expanded:
+                raise SearchLimitReached(f"Gave up after expanding {max_expanded:,} states")
+            moves = rules.moves(state)
+            stats.expanded += 1
+            stats.generated += len(moves)
+            if expand is not None:
+                expand(stats, state, moves)
+            path.append(state)
+            on_path.add(state)
+            pending.append(iter(moves))
+            if len(pending) > stats.peak_frontier:
+                stats.peak_frontier = len(pending)
+                stats.measure_memory()
+
+        # The path is back to just the start; measure before the table is
+        # cleared, as it is fullest at the end of an iteration
+        path.append(start)
+        on_path.add(start)
+        stats.measure_memory()
+        if next_bound is None:
+            return None
+        if complete and all(state in table for state in cut):
+            return None
+        # No shortest path is longer than there are states
+        if next_bound >= rules.state_count:
+            return None
+        bound = next_bound
+
+
+def numpy_bfs_solve(rules, start, goal, stats=None):
+    if stats is None:
+        stats = SearchStats()
+    # Imported here so plain solves don't pay for loading NumPy
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("The 'numpy' solver needs NumPy: pip install numpy") from None
+    began = time.perf_counter()
+    try:
+        return _numpy_bfs(numpy, rules, start, goal, stats)
+    finally:
+        stats.finish(began)
+
+
+# Largest state space the NumPy solver will allocate dense arrays for: at
+# 2^28 states, a 32 MiB visited bitmap and 256 MiB of parent loads
+NUMPY_MAX_BITS = 28
+
+
+def _numpy_bfs(np, rules, start, goal, stats):
+    # BFS one whole layer at a time: every load is XORed into the layer at
+    # once, unsafe banks are masked out with the conflict masks, and new
+    # states are checked against a visited bitmap, eight states to a byte.
+    # Each state remembers which load reached it, which is enough to walk
+    # back.
+    if not isinstance(rules, BitmaskRules):
+        raise ValueError("The NumPy solver only works with BitmaskRules")
+    if rules.size > NUMPY_MAX_BITS:
+        raise ValueError(f"{rules.size} state bits is too many for the dense NumPy solver")
+    if start == goal:
+        return [start]
+
+    states = 1 << rules.size
+    visited = np.zeros((states + 7) >> 3, dtype=np.uint8)
+    load_dtype = np.uint8 if len(rules.loads) <= 0xFF else np.uint16 if len(rules.loads) <= 0xFFFF else np.uint32
+    parent_load = np.zeros(states, dtype=load_dtype)
+    conflicts = [np.int64(pair) for pair in rules.conflicts]
+    guards = np.int64(rules.guards)
+    full = np.int64(rules.full)
+
+    def safe(banks):
+        clash = np.zeros(banks.shape, dtype=np.bool_)
+        for pair in conflicts:
+            clash |= (banks & pair) == pair
+        # Only a bank without a guard on it can go wrong
+        return ~clash | ((banks & guards) != 0)
+
+    stats.track(visited, parent_load)
+    expand = stats.on_expand
+
+    visited[start >> 3] |= 1 << (start & 7)
+    stats.visited = 1
+    layer = np.array([start], dtype=np.int64)
+    depth = 0
+    while layer.size:
+        stats.layer(depth, int(layer.size))
+        depth += 1
+        stats.expanded += int(layer.size)
+        here = np.where((layer & rules.boat) != 0, layer, full ^ layer)
+        there = full ^ here
+
+        found = []
+        found_loads = []
+        for index, load in enumerate(rules.loads):
+            load = np.int64(load)
+            boarding = (here & load) == load
+            if not boarding.any():
+                continue
+            ok = safe(here[boarding] ^ load) & safe(there[boarding] | load)
+            moved = layer[boarding][ok] ^ load
+            found.append(moved)
+            found_loads.append(np.full(moved.size, index, dtype=load_dtype))
+        if not found:
+            break
+
+        moved = np.concatenate(found)
+        moved_loads = np.concatenate(found_loads)
+        stats.generated += int(moved.size)
+        if expand is not None:
+            expand(stats, layer, moved)
+        fresh = (visited[moved >> 3] >> (moved & 7).astype(np.uint8)) & 1 == 0
+        # np.unique keeps the first load that reached each new state
+        layer, first = np.unique(moved[fresh], return_index=True)
+        stats.duplicates += int(moved.size - layer.size)
+        stats.visited += int(layer.size)
+        parent_load[layer] = moved_loads[fresh][first]
+        if not layer.size:
+            break
+
+        # The layer is sorted, so states sharing a byte are neighbours: OR
+        # their bits together per byte, then into the bitmap
+        cells = layer >> 3
+        bits = np.left_shift(1, layer & 7).astype(np.uint8)
+        firsts = np.flatnonzero(np.concatenate(([True], cells[1:] != cells[:-1])))
+        visited[cells[firsts]] |= np.bitwise_or.reduceat(bits, firsts)
+
+        if visited[goal >> 3] >> (goal & 7) & 1:
+            path = [goal]
+            state = goal
+            while state != start:
+                state ^= rules.loads[int(parent_load[state])]
+                path.append(state)
+            path.reverse()
+            return path
+    return None
+
+
+SOLVERS = {
+    "bfs": bfs_solve,
+    "bidirectional": bidirectional_bfs_solve,
+    "astar": astar_solve,
+    "numpy": numpy_bfs_solve,
+    "iddfs": iddfs_solve,
+    "idastar": idastar_solve,
+}
+
+
+def solve(rules, start, goal, method="bfs", stats=None, **options):
+    if method not in SOLVERS:
+        raise ValueError(f"Unknown solver {method!r}, expected one of {sorted(SOLVERS)}")
+    return SOLVERS[method](rules, start, goal, stats, **options)
+
+
+def compare_solvers(rules, start, goal, methods=None):
+    rows = []
+    for method in methods or SOLVERS:
+        stats = SearchStats()
+        path = solve(rules, start, goal, method, stats)
+        rows.append({
+            "method": method,
+            "moves": None if path is None else len(path) - 1,
+            "expanded": stats.expanded,
+            "generated": stats.generated,
+            "peak_memory": stats.peak_memory,
+            "seconds": stats.seconds,
+        })
+    return rows
+
+
+def print_comparison(title, rows):
+    print(title)
+    print(f"  {'method':<14}{'moves':>7}{'expanded':>12}{'generated':>12}{'peak KiB':>11}{'seconds':>10}")
+    for row in rows:
+        moves = "-" if row["moves"] is None else row["moves"]
+        print(f"  {row['method']:<14}{moves:>7}{row['expanded']:>12}{row['generated']:>12}"
+              f"{row['peak_memory'] / 1024:>11.1f}{row['seconds']:>10.3f}")
+
+
+if __name__ == "__main__":
+    # python river_crossing_core.py [size] - compare the solvers side by side
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    print_comparison("Classic puzzle", compare_solvers(CLASSIC, CLASSIC.start, CLASSIC.goal))
+    # The depth-first modes trade time for memory, far too much of it here
+    breadth_first = [method for method in SOLVERS if method not in DEPTH_FIRST_SOLVERS]
+    scaled = scaled_spec(size).compile()
+    print_comparison(f"Scaled puzzle, {size} entities",
+                     compare_solvers(scaled, scaled.start, scaled.goal, breadth_first))
+    missionaries = missionaries_spec(size, capacity=4).compile()
+    print_comparison(f"Missionaries and cannibals, {size} of each",
+                     compare_solvers(missionaries, missionaries.start, missionaries.goal,
+                                     [method for method in breadth_first if method != "numpy"]))
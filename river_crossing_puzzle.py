@@ -1,8 +1,57 @@
 import tkinter as tk
 from tkinter import messagebox
-import queue
 import time
 
+import frame_stats
+import river_crossing_core as core
+
+try:
+    from PIL import Image, ImageDraw, ImageFont, ImageTk
+except ImportError:  # Pillow is optional; without it emoji are drawn as canvas text
+    Image = None
+
+
+class EmojiAtlas:
+    # Emoji rasterised once per glyph and size, so drawing a character is a
+    # canvas image instead of text the font engine shapes on every redraw.
+    # get() returns None when Pillow or a colour emoji font is missing and
+    # the caller falls back to create_text.
+
+    # Colour emoji fonts on Windows, Linux and macOS with the size they can
+    # be loaded at (bitmap fonts only come in fixed sizes)
+    FONTS = (("seguiemj.ttf", 109), ("NotoColorEmoji.ttf", 109), ("Apple Color Emoji.ttc", 160))
+
+    def __init__(self):
+        self.font = self.load_font() if Image is not None else None
+        self.images = {}
+
+    def load_font(self):
+        for filename, size in self.FONTS:
+            try:
+                return ImageFont.truetype(filename, size)
+            except OSError:
+                continue
+        return None
+
+    def get(self, glyph, size):
+        if self.font is None:
+            return None
+        key = (glyph, size)
+        if key not in self.images:
+            self.images[key] = self.render(glyph, size)
+        return self.images[key]
+
+    def render(self, glyph, size):
+        left, top, right, bottom = self.font.getbbox(glyph)
+        image = Image.new("RGBA", (max(1, right - left), max(1, bottom - top)), (0, 0, 0, 0))
+        ImageDraw.Draw(image).text((-left, -top), glyph, font=self.font, embedded_color=True)
+        box = image.getbbox()
+        if box is None:
+            return None
+        image = image.crop(box)
+        image.thumbnail((size, size), Image.LANCZOS)
+        return ImageTk.PhotoImage(image)
+
 
 class RiverCrossingGUI:
     def __init__(self, root):
@@ -12,15 +61,22 @@ class RiverCrossingGUI:
         self.root.configure(bg='lightblue')
 
         # Game state - (farmer, lion, goat, grass) - False=left, True=right
+        self.rules = core.CLASSIC
         self.current_state = (False, False, False, False)
         self.start_state = (False, False, False, False)
         self.goal_state = (True, True, True, True)
         self.solution_path = []
         self.current_step = 0
         self.auto_solving = False
+        self.distances = None  # Built on first use, see distance_table()
+        self.scene_rules = None  # Rules the canvas items were built for
+        self.emoji_atlas = EmojiAtlas()
+        self.frame_stats = frame_stats.from_environment()
 
         self.setup_ui()
         self.update_display()
+        if self.frame_stats is not None:
+            self.start_frame_stats()
 
     def setup_ui(self):
         # Title
@@ -55,12 +111,39 @@ class RiverCrossingGUI:
         tk.Button(controls, text="Manual Move", command=self.show_manual_options,
                   font=("Arial", 12), bg='orange', fg='white').pack(side=tk.LEFT, padx=5)
 
+        tk.Button(controls, text="Hint", command=self.show_hint,
+                  font=("Arial", 12), bg='purple', fg='white').pack(side=tk.LEFT, padx=5)
+
         # Status label
         self.status_label = tk.Label(self.root, text="Click 'Auto Solve' to see the solution!",
                                      font=("Arial", 12), bg='lightblue')
         self.status_label.pack(pady=5)
 
-    def draw_scene(self):
+    def start_frame_stats(self):
+        # Rolling percentiles over the canvas' top left corner
+        self.stats_overlay = tk.Label(self.root, font=("Courier", 9), bg='black', fg='white',
+                                      justify=tk.LEFT, anchor='nw')
+        self.stats_overlay.place(in_=self.canvas, x=4, y=4)
+        self.overlay_refreshed = 0
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        self.root.after(round(frame_stats.PROBE_INTERVAL * 1000), self.on_stats_probe)
+
+    def on_stats_probe(self):
+        # A fast repeating after() whose lateness shows how busy Tk's loop is
+        self.frame_stats.tick("timer jitter", frame_stats.PROBE_INTERVAL)
+        now = time.perf_counter()
+        if now - self.overlay_refreshed >= frame_stats.OVERLAY_INTERVAL:
+            self.overlay_refreshed = now
+            self.stats_overlay.config(text=self.frame_stats.overlay_text())
+        self.root.after(round(frame_stats.PROBE_INTERVAL * 1000), self.on_stats_probe)
+
+    def close(self):
+        self.frame_stats.dump_csv()
+        self.root.destroy()
+
+    def build_scene(self):
+        # Everything is created once; draw_scene() only moves or reconfigures
+        # the items that changed between states
         self.canvas.delete("all")
 
         # Draw river
@@ -71,105 +154,88 @@ class RiverCrossingGUI:
         self.canvas.create_text(125, 30, text="Starting Side", font=("Arial", 14, "bold"))
         self.canvas.create_text(575, 30, text="Target Side", font=("Arial", 14, "bold"))
 
+        # Boat, characters and the warning start hidden until the first draw
+        self.boat_item = self.canvas.create_oval(0, 0, 0, 0, fill='brown', outline='black', width=2)
+        emoji_size = 30 if len(self.rules.names) <= 8 else 18
+        self.character_items = []
+        for name in self.rules.names:
+            # Pre-rendered emoji where we can, plain text otherwise
+            glyph = core.EMOJI.get(name)
+            image = self.emoji_atlas.get(glyph, emoji_size * 4 // 3) if glyph else None
+            if image is not None:
+                emoji = self.canvas.create_image(0, 0, image=image)
+            else:
+                emoji = self.canvas.create_text(0, 0, text=glyph or name[:1], font=("Arial", emoji_size))
+            label = self.canvas.create_text(0, 0, text=name, font=("Arial", 10))
+            self.character_items.append((emoji, label))
+        self.warning_item = self.canvas.create_text(350, 380, text="⚠️ INVALID STATE! ⚠️",
+                                                    font=("Arial", 14, "bold"), fill='red', state='hidden')
+
+        self.scene_rules = self.rules
+        self.drawn_boat = None
+        self.drawn_positions = [None] * len(self.rules.names)
+        self.drawn_valid = True
+
+    def draw_scene(self):
+        if self.scene_rules is not self.rules:
+            self.build_scene()
+
         # Draw boat
-        farmer, lion, goat, grass = self.current_state
-        boat_x = 300 if not farmer else 400
-        self.canvas.create_oval(boat_x - 20, 180, boat_x + 20, 220, fill='brown', outline='black', width=2)
+        boat_x = 400 if self.current_state[self.rules.boat_index] else 300
+        if boat_x != self.drawn_boat:
+            self.canvas.coords(self.boat_item, boat_x - 20, 180, boat_x + 20, 220)
+            self.drawn_boat = boat_x
 
         # Draw characters based on current state
         self.draw_characters()
 
         # Highlight invalid states
-        if not self.is_valid(self.current_state):
-            self.canvas.create_text(350, 380, text="⚠️ INVALID STATE! ⚠️",
-                                    font=("Arial", 14, "bold"), fill='red')
+        valid = self.rules.state_is_valid(self.current_state)
+        if valid != self.drawn_valid:
+            self.canvas.itemconfig(self.warning_item, state='hidden' if valid else 'normal')
+            self.drawn_valid = valid
 
     def draw_characters(self):
-        farmer, lion, goat, grass = self.current_state
-
-        # Character positions
-        left_positions = [(50, 100), (50, 150), (50, 200), (50, 250)]
-        right_positions = [(650, 100), (650, 150), (650, 200), (650, 250)]
-
-        characters = [
-            ("👨‍🌾", "Farmer", farmer),
-            ("🦁", "Lion", lion),
-            ("🐐", "Goat", goat),
-            ("🌾", "Grass", grass)
-        ]
-
-        left_idx = 0
-        right_idx = 0
-
-        for emoji, name, side in characters:
-            if side:  # Right side
-                x, y = right_positions[right_idx]
-                right_idx += 1
-            else:  # Left side
-                x, y = left_positions[left_idx]
-                left_idx += 1
-
-            # Draw character
-            self.canvas.create_text(x, y, text=emoji, font=("Arial", 30))
-            self.canvas.create_text(x, y + 40, text=name, font=("Arial", 10))
-
-    def is_valid(self, state):
-        farmer, lion, goat, grass = state
-        # Lion and goat alone together (farmer not with them)
-        if lion == goat and farmer != goat:
-            return False
-        # Goat and grass alone together (farmer not with them)
-        if goat == grass and farmer != goat:
-            return False
-        return True
-
-    def generate_moves(self, state):
-        farmer, lion, goat, grass = state
-        moves = []
-
-        # Farmer takes goat
-        if farmer == goat:
-            new_state = (not farmer, lion, not goat, grass)
-            if self.is_valid(new_state):
-                moves.append(new_state)
-
-        # Farmer takes lion
-        if farmer == lion:
-            new_state = (not farmer, not lion, goat, grass)
-            if self.is_valid(new_state):
-                moves.append(new_state)
-
-        # Farmer takes grass
-        if farmer == grass:
-            new_state = (not farmer, lion, goat, not grass)
-            if self.is_valid(new_state):
-                moves.append(new_state)
-
-        # Farmer goes alone
-        new_state = (not farmer, lion, goat, grass)
-        if self.is_valid(new_state):
-            moves.append(new_state)
-
-        return moves
-
-    def bfs_solve(self):
-        visited = set()
-        q = queue.Queue()
-        q.put((self.start_state, [self.start_state]))
-
-        while not q.empty():
-            state, path = q.get()
-            if state == self.goal_state:
-                return path
-
-            visited.add(state)
-            for move in self.generate_moves(state):
-                if move not in visited:
-                    q.put((move, path + [move]))
-        return None
+        # Each character keeps its own slot on either bank, so only the ones
+        # that crossed need moving
+        for i, (emoji, label) in enumerate(self.character_items):
+            position = self.character_position(i, self.current_state[i])
+            if position != self.drawn_positions[i]:
+                x, y = position
+                self.canvas.coords(emoji, x, y)
+                self.canvas.coords(label, x, y + 40)
+                self.drawn_positions[i] = position
+
+    def character_position(self, slot, right_side):
+        # Four to a column like the original layout, more rows and columns
+        # once a bigger puzzle needs them
+        count = len(self.rules.names)
+        rows = min(6, max(4, -(-count // 4)))
+        column, row = divmod(slot, rows)
+        step = min(50, 200 // max(1, -(-count // rows)))
+        x = 50 + column * step
+        return (700 - x if right_side else x), 100 + row * 50
+
+    def distance_table(self):
+        # Distances to the goal from every state, so manual play can get back
+        # on an optimal track without searching again
+        if self.distances is None:
+            self.distances = core.DistanceTable(self.rules, self.rules.encode(self.goal_state))
+        return self.distances
+
+    def solve_from_here(self):
+        # A walk down the distance table, quicker than any cache lookup
+        start = self.rules.encode(self.current_state)
+        started = time.perf_counter()
+        path = self.distance_table().path_from(start)
+        if self.frame_stats is not None:
+            self.frame_stats.record("solver", (time.perf_counter() - started) * 1000)
+        if path is None:
+            return None
+        return [self.rules.decode(mask) for mask in path]
 
     def auto_solve(self):
-        self.solution_path = self.bfs_solve()
+        self.solution_path = self.solve_from_here()
         if self.solution_path:
             self.current_step = 0
             self.auto_solving = True
@@ -199,7 +265,7 @@ class RiverCrossingGUI:
             self.status_label.config(text="Puzzle already completed!")
 
     def show_manual_options(self):
-        moves = self.generate_moves(self.current_state)
+        moves = self.rules.next_states(self.current_state)
         if not moves:
             messagebox.showinfo("No Moves", "No valid moves available from current state!")
             return
@@ -212,38 +278,38 @@ class RiverCrossingGUI:
         tk.Label(move_window, text="Available Moves:", font=("Arial", 12, "bold")).pack(pady=10)
 
         for i, move in enumerate(moves):
-            move_text = self.describe_move(self.current_state, move)
+            move_text = self.rules.describe_move(self.current_state, move)
             tk.Button(move_window, text=move_text,
                       command=lambda m=move, w=move_window: self.make_manual_move(m, w),
                       font=("Arial", 10)).pack(pady=2, padx=20, fill=tk.X)
 
-    def describe_move(self, current, new):
-        farmer_current, lion_current, goat_current, grass_current = current
-        farmer_new, lion_new, goat_new, grass_new = new
-
-        if farmer_current != farmer_new:
-            # Farmer is moving
-            if goat_current != goat_new:
-                return "Farmer takes Goat across"
-            elif lion_current != lion_new:
-                return "Farmer takes Lion across"
-            elif grass_current != grass_new:
-                return "Farmer takes Grass across"
-            else:
-                return "Farmer goes alone"
-        return "Unknown move"
+    def show_hint(self):
+        table = self.distance_table()
+        state = self.rules.encode(self.current_state)
+        best = table.best_move(state)
+        if self.current_state == self.goal_state:
+            self.status_label.config(text="Puzzle already completed!")
+        elif best is None:
+            self.status_label.config(text="No way to finish from here. Try 'Reset'.")
+        else:
+            move_text = self.rules.describe_move(self.current_state, self.rules.decode(best))
+            self.status_label.config(text=f"Hint: {move_text} ({table.distance(state)} moves left)")
 
     def make_manual_move(self, new_state, window):
         self.current_state = new_state
         self.update_display()
-        self.solution_path = []  # Clear auto-solve path
+        # Pick up the optimal track from wherever the user is now
+        self.solution_path = self.solve_from_here() or []
         self.current_step = 0
 
         if self.current_state == self.goal_state:
             self.status_label.config(text="🎉 Puzzle Solved Manually! Great job! 🎉")
             messagebox.showinfo("Congratulations!", "You've manually solved the puzzle!")
+        elif not self.solution_path:
+            self.status_label.config(text="Manual move made, but there's no way to finish from here!")
         else:
-            self.status_label.config(text="Manual move made. Continue solving!")
+            self.status_label.config(
+                text=f"Manual move made. {len(self.solution_path) - 1} moves left at best.")
 
         window.destroy()
 
@@ -256,7 +322,14 @@ class RiverCrossingGUI:
         self.update_display()
 
     def update_display(self):
-        self.draw_scene()
+        if self.frame_stats is None:
+            self.draw_scene()
+            return
+        with self.frame_stats.measure("update_display"):
+            self.draw_scene()
+        # Tk redraws on idle; flushing here is what the canvas repaint costs
+        with self.frame_stats.measure("paint"):
+            self.canvas.update_idletasks()
 
 
 def main():
@@ -0,0 +1,186 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import river_crossing_core as core
+
+# Solutions keyed by the rules' fingerprint plus the start and goal states,
+# so "Find Solution" on a puzzle that was solved before is a lookup. An LRU
+# in memory sits in front of an optional sqlite file that survives restarts
+# and is shared by all three frontends.
+#
+# Only reads touch the file on the caller's thread. New solutions and the
+# "used" times of disk hits are queued and written by a background thread,
+# a burst at a time in one transaction, so a GUI never waits on a commit.
+
+MISSING = object()  # get() result for "never solved", as None means "no solution"
+WRITE_DELAY = 0.5  # Seconds the writer waits so a burst of puts shares one commit
+
+
+def default_cache_path():
+    path = os.environ.get("RIVER_CROSSING_CACHE")
+    if path:
+        return path
+    return os.path.join(os.path.expanduser("~"), ".cache", "river_crossing", "solutions.sqlite3")
+
+
+class SolutionCache:
+    def __init__(self, max_entries=256, path=None, max_disk_entries=10000):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()  # Solves may finish on worker threads
+        self.db_lock = threading.Lock()  # Held for every use of the connection
+        self.db = None
+        self.pending = {}  # key -> (path JSON, or None to only mark it used, time) for the writer
+        self.wake = threading.Event()
+        self.writer = None
+        if path is not None:
+            self.open_store(path)
+
+    def open_store(self, path):
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS solutions ("
+                            "key TEXT PRIMARY KEY, path TEXT, used REAL)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS solutions_used ON solutions (used)")
+            self.db.commit()
+        except (OSError, sqlite3.Error):
+            # Keep working from memory when the store can't be opened
+            self.db = None
+
+    def key(self, rules, start, goal):
+        return f"{rules.fingerprint()}:{start}:{goal}"
+
+    def get(self, rules, start, goal):
+        key = self.key(rules, start, goal)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+
+            path = MISSING
+            if key in self.pending and self.pending[key][0] is not None:
+                path = json.loads(self.pending[key][0])
+            elif self.db is not None:
+                try:
+                    with self.db_lock:
+                        row = self.db.execute("SELECT path FROM solutions WHERE key = ?", (key,)).fetchone()
+                    if row is not None:
+                        path = json.loads(row[0])
+                        self._queue(key, None)
+                except sqlite3.Error:
+                    pass
+
+            if path is MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._remember(key, path)
+            return path
+
+    def put(self, rules, start, goal, path):
+        key = self.key(rules, start, goal)
+        with self.lock:
+            self._remember(key, path)
+            if self.db is not None:
+                self._queue(key, json.dumps(path))
+
+    def _queue(self, key, text):
+        # Called with self.lock held. A touch doesn't replace a queued insert
+        if text is None and key in self.pending:
+            text = self.pending[key][0]
+        self.pending[key] = (text, time.time())
+        if self.writer is None:
+            self.writer = threading.Thread(target=self._write_loop, daemon=True)
+            self.writer.start()
+        self.wake.set()
+
+    def _write_loop(self):
+        while True:
+            self.wake.wait()
+            time.sleep(WRITE_DELAY)
+            if not self.flush():
+                return
+
+    def flush(self):
+        # Writes everything queued in one transaction; False once closed
+        with self.lock:
+            self.wake.clear()
+            if self.db is None:
+                return False
+            batch = self.pending
+            self.pending = {}
+        if not batch:
+            return True
+        inserts = [(key, text, used) for key, (text, used) in batch.items() if text is not None]
+        touches = [(used, key) for key, (text, used) in batch.items() if text is None]
+        with self.db_lock:
+            if self.db is None:
+                return False
+            try:
+                self.db.executemany("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?)", inserts)
+                self.db.executemany("UPDATE solutions SET used = ? WHERE key = ?", touches)
+                # Drop the least recently used rows, only once over the disk budget
+                count = self.db.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+                if count > self.max_disk_entries:
+                    self.db.execute("DELETE FROM solutions WHERE key IN ("
+                                    "SELECT key FROM solutions ORDER BY used LIMIT ?)",
+                                    (count - self.max_disk_entries,))
+                self.db.commit()
+            except sqlite3.Error:
+                pass
+        return True
+
+    def _remember(self, key, path):
+        self.entries[key] = path
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def solve(self, rules, start, goal, method="bfs", stats=None, **options):
+        path = self.get(rules, start, goal)
+        if path is MISSING:
+            path = core.solve(rules, start, goal, method, stats, **options)
+            self.put(rules, start, goal, path)
+        return path
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.pending.clear()
+            if self.db is not None:
+                with self.db_lock:
+                    self.db.execute("DELETE FROM solutions")
+                    self.db.commit()
+
+    def close(self):
+        # Writes what is still queued, then stops the writer
+        self.flush()
+        with self.lock, self.db_lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
+        self.wake.set()
+
+
+_shared = None
+
+
+def shared_cache():
+    # One cache per process, backed by the default on-disk store
+    global _shared
+    if _shared is None:
+        _shared = SolutionCache(path=default_cache_path())
+        atexit.register(_shared.close)
+    return _shared